@@ -5,8 +5,9 @@ from .models import CruxReport, AnalysisSession
 class CruxReportAdmin(admin.ModelAdmin):
     list_display = ['url', 'form_factor', 'largest_contentful_paint', 'created_at']
     list_filter = ['form_factor', 'created_at']
-    search_fields = ['url']
-    readonly_fields = ['created_at']
+    search_fields = ['url', 'canonical_url']
+    readonly_fields = ['canonical_url', 'url_key', 'created_at']
+    raw_id_fields = ['session']
 
 @admin.register(AnalysisSession)
 class AnalysisSessionAdmin(admin.ModelAdmin):
@@ -0,0 +1,225 @@
+"""CrUX API client and the fetch, process and store pipeline for one URL
+
+Only the analyze endpoint, batch runs and sitemap discovery need this, so
+the views import it on first use; workers that only serve stored data
+never load requests or the upstream client stack.
+"""
+import logging
+
+import requests
+from django.conf import settings
+
+from .canonical import canonicalize_url, url_key
+from .instrumentation import (
+    ANALYSIS_OUTCOMES, CACHE_HITS, DB_WRITE_TIME, FALLBACKS, OUTCOMES_BY_STATUS, PROCESS_METRICS_TIME,
+)
+from .keypool import NoApiKeyAvailable, get_key_pool
+from .models import CruxReport
+from .resilience import CircuitOpenError, get_upstream, is_transient
+from .results import CORE_VITALS, METRIC_NAMES, AnalysisResult, Metric, overall_rating
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class CruxAPIClient:
+    """Client for interacting with Chrome UX Report API"""
+    
+    def __init__(self, key_pool=None, key_wait=None):
+        # key_wait: seconds to wait for key quota per call (default: the pool's max_wait)
+        self.key_pool = get_key_pool() if key_pool is None else key_pool
+        self.key_wait = key_wait
+        self.base_url = settings.CRUX_API_URL
+        self.upstream = get_upstream()
+    
+    def get_url_metrics(self, url, form_factor='ALL_FORM_FACTORS'):
+        """Fetch CrUX metrics following official Chrome Developers documentation"""
+        if not self.key_pool:
+            raise ValueError("CrUX API key not configured")
+        
+        # Clean up the URL according to CrUX API requirements
+        clean_url = canonicalize_url(url) or url
+        
+        # Valid metrics as of 2024/2025 - FID is deprecated, replaced by INP
+        valid_metrics = [
+            "largest_contentful_paint",         # LCP - Loading
+            "cumulative_layout_shift",          # CLS - Visual Stability  
+            "interaction_to_next_paint",        # INP - Interactivity (replaces FID)
+            "first_contentful_paint"            # FCP - Loading
+            # Note: time_to_first_byte and first_input_delay are no longer available
+        ]
+        
+        # Try both origin and URL approaches as per official docs
+        payloads = [
+            {
+                "description": "URL-based query",
+                "query_shape": "url",
+                "payload": {
+                    "url": clean_url,
+                    "formFactor": form_factor,
+                    "metrics": valid_metrics
+                }
+            },
+            {
+                "description": "Origin-based query",
+                "query_shape": "origin",
+                "payload": {
+                    "origin": clean_url,
+                    "formFactor": form_factor,
+                    "metrics": valid_metrics
+                }
+            }
+        ]
+        
+        logger.info("Making CrUX API request for %s with form factor %s", clean_url, form_factor,
+                    extra={'url': clean_url, 'form_factor': form_factor})
+        logger.debug("Using metrics: %s", valid_metrics)
+        
+        # Try URL first, then origin
+        for attempt in payloads:
+            try:
+                # Timeouts, retries, hedging and the circuit breaker live in the upstream client
+                response = self.upstream.post(
+                    self.base_url,
+                    attempt["payload"],
+                    query_shape=attempt["query_shape"],
+                    keys=self.key_pool,
+                    key_wait=self.key_wait,
+                )
+                
+                logger.info("CrUX API response status: %s for %s", response.status_code, attempt['description'],
+                            extra={'url': clean_url, 'query_shape': attempt['query_shape'], 'status': response.status_code})
+                
+                if response.status_code == 200:
+                    logger.debug("✅ Successfully received CrUX data")
+                    return response.json()
+                elif response.status_code in (400, 404):
+                    # The API answers 404 when it has no data for this query shape
+                    try:
+                        error_details = response.json()
+                        logger.warning("%s error details: %s", response.status_code, error_details)
+                    except:
+                        pass
+                    logger.warning("%s error for %s, trying next approach...", response.status_code, attempt['description'])
+                    if attempt["query_shape"] == "url":
+                        FALLBACKS.inc(reason='origin_query')
+                    continue
+                else:
+                    response.raise_for_status()
+                    
+            except requests.exceptions.HTTPError as e:
+                if e.response.status_code == 400:
+                    continue  # Try next approach
+                logger.error("CrUX API HTTP error for %s: %s", clean_url, e)
+                raise
+            except requests.exceptions.RequestException as e:
+                logger.error("CrUX API request failed for %s: %s", clean_url, e)
+                raise
+        
+        # If both approaches failed with 400, raise an exception
+        raise requests.exceptions.HTTPError(f"No CrUX data available for {clean_url}")
+    
+    def parse_metrics(self, api_response, url, form_factor):
+        """Process API response into a compact AnalysisResult"""
+        return AnalysisResult.from_record(api_response, url, form_factor)
+    
+    def process_metrics(self, api_response, url, form_factor):
+        """Process API response into structured format"""
+        return self.parse_metrics(api_response, url, form_factor).to_dict()
+    
+    def calculate_overall_performance(self, metrics):
+        """Calculate overall performance rating based on Core Web Vitals"""
+        core_vitals = {METRIC_NAMES[metric] for metric in CORE_VITALS}
+        return overall_rating(
+            metric['good_ratio'] for metric in metrics if metric['metric_name'] in core_vitals
+        )
+
+def analyze_url(client, url, form_factor, persist=True, session=None):
+    """Fetch, process and (unless ``persist`` is False) store CrUX data for one URL
+
+    Stored reports are linked to ``session`` when one is given. Returns an
+    AnalysisResult; callers convert it with to_dict() when responding.
+
+    Upstream errors are turned into placeholder results so a batch can
+    carry on with the remaining URLs.
+    """
+    try:
+        # Fetch data from CrUX API
+        api_response = client.get_url_metrics(url, form_factor)
+        with span('process'), PROCESS_METRICS_TIME.time():
+            result = client.parse_metrics(api_response, url, form_factor)
+        
+        # Save to database
+        crux_report = CruxReport(
+            url=url,
+            form_factor=form_factor,
+            api_response=api_response,
+            session=session
+        )
+        
+        # Extract specific metrics; every stored column is needed to diff sessions
+        for metric in result.metrics():
+            setattr(crux_report, metric.field, result.p75(metric))
+        
+        if persist:
+            with DB_WRITE_TIME.time(model='CruxReport'):
+                crux_report.save()
+        ANALYSIS_OUTCOMES.inc(outcome='ok')
+        return result
+        
+    except requests.exceptions.HTTPError as e:
+        # get_url_metrics raises a bare HTTPError when no query shape had data
+        status_code = e.response.status_code if e.response is not None else 400
+        ANALYSIS_OUTCOMES.inc(outcome=OUTCOMES_BY_STATUS.get(status_code, 'upstream_error'))
+        if status_code == 400:
+            logger.warning("No CrUX data available for %s - using fallback data", url)
+            FALLBACKS.inc(reason='no_data')
+            # Return fallback data for URLs without CrUX data
+            return AnalysisResult.placeholder(url, form_factor, 'No data available', metrics=(Metric.LCP,))
+        elif status_code == 403:
+            logger.error("API key permission denied for %s", url)
+            return AnalysisResult.placeholder(url, form_factor, 'API key error - check permissions')
+        else:
+            logger.error("HTTP error analyzing URL %s: %s", url, e)
+            if is_transient(status_code):
+                cached = cached_result(url, form_factor)
+                if cached is not None:
+                    return cached
+            return AnalysisResult.placeholder(url, form_factor, f'API Error: {status_code}')
+    except requests.exceptions.RequestException as e:
+        # Circuit open, no usable key, timeouts and connection failures: serve stored data if there is any
+        if isinstance(e, CircuitOpenError):
+            outcome = 'circuit_open'
+        elif isinstance(e, NoApiKeyAvailable):
+            outcome = 'no_api_key'
+        else:
+            outcome = 'upstream_error'
+        ANALYSIS_OUTCOMES.inc(outcome=outcome)
+        logger.error("CrUX API unavailable for %s: %s", url, e)
+        cached = cached_result(url, form_factor)
+        if cached is not None:
+            return cached
+        return AnalysisResult.placeholder(url, form_factor, (
+            'API key error - all keys quarantined or out of quota' if outcome == 'no_api_key'
+            else 'CrUX API unavailable - try again later'
+        ))
+    except Exception as e:
+        logger.error("Error analyzing URL %s: %s", url, e)
+        ANALYSIS_OUTCOMES.inc(outcome='error')
+        return AnalysisResult.placeholder(url, form_factor, f'Error: {str(e)}')
+
+def cached_result(url, form_factor):
+    """Latest stored CrUX result for the URL, served while the upstream API is unhealthy
+
+    The result is flagged ``stale`` and keeps the stored report's created_at.
+    """
+    report = CruxReport.objects.filter(
+        url_key=url_key(url), form_factor=form_factor, api_response__has_key='record',
+    ).first()
+    if report is None:
+        return None
+    CACHE_HITS.inc(cache='db_fallback')
+    FALLBACKS.inc(reason='stale_cache')
+    result = AnalysisResult.from_report(report)
+    result.stale = True
+    return result
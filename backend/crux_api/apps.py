@@ -1,7 +1,15 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CruxApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'crux_api'
-    verbose_name = 'Chrome UX Report API'
\ No newline at end of file
+    verbose_name = 'Chrome UX Report API'
+
+    def ready(self):
+        from .db import apply_sqlite_pragmas
+        from .startup import watch_first_request
+
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='crux_api.apply_sqlite_pragmas')
+        watch_first_request()
@@ -0,0 +1,171 @@
+"""Resumable, parallel batch analysis of URL lists outside the web tier"""
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .analysis import CruxAPIClient, analyze_url
+from .bulk_import import iter_bounded, iter_chunks
+from .canonical import url_key
+from .keypool import KeyPool, configured_api_keys
+from .models import AnalysisSession
+from .results import AnalysisResult
+from .workers import process_pool
+
+logger = logging.getLogger(__name__)
+
+MODES = ('thread', 'process')
+
+# Set in process-mode workers, which each get a share of the per-key quota
+_worker_key_pool = None
+
+
+def iter_url_lines(stream):
+    """http(s) URLs from a text stream, one per line; blank lines and # comments are skipped"""
+    for line in stream:
+        url = line.strip()
+        if not url or url.startswith('#'):
+            continue
+        if url.startswith('http://') or url.startswith('https://'):
+            yield url
+        else:
+            logger.warning("Skipping invalid URL: %s", url[:200])
+
+
+def classify(result):
+    """Bucket a result for the run statistics: ok, stale, no_data or failed"""
+    if result.stale:
+        return 'stale'
+    if result.has_data():
+        return 'ok'
+    if result.overall_performance in ('No data available', 'Insufficient data'):
+        return 'no_data'
+    return 'failed'
+
+
+def chunk_session_id(run_id, position):
+    """AnalysisSession id for the chunk starting at input ``position``; the same on every resume of a run"""
+    return str(uuid.uuid5(uuid.UUID(run_id), str(position)))
+
+
+def analyze_chunk(urls, form_factor, persist, session_id=None, key_wait=None):
+    """Worker entry point: analyze one chunk and return (AnalysisResults, per-URL seconds)
+
+    When persisting, the chunk's URLs are grouped into the AnalysisSession
+    ``session_id``. If that session already exists (the chunk was in
+    flight when an earlier run stopped), URLs it already holds reports for
+    are read back instead of being analyzed and stored again.
+    """
+    close_old_connections()
+    client = CruxAPIClient(key_pool=_worker_key_pool, key_wait=key_wait)
+    session = None
+    stored = {}
+    if persist:
+        session, created = AnalysisSession.objects.get_or_create(
+            session_id=session_id or str(uuid.uuid4()), defaults={'urls': urls},
+        )
+        if not created:
+            # Newest first, so setdefault keeps the latest report per URL
+            for report in session.reports.filter(form_factor=form_factor):
+                stored.setdefault(report.url_key, report)
+    results = []
+    latencies = []
+    for url in urls:
+        report = stored.get(url_key(url))
+        if report is not None:
+            results.append(AnalysisResult.from_report(report))
+            continue
+        started = time.perf_counter()
+        results.append(analyze_url(client, url, form_factor, persist=persist, session=session))
+        latencies.append(time.perf_counter() - started)
+    close_old_connections()
+    return results, latencies
+
+
+def _init_process_worker(processes):
+    """Process-pool initializer, run by workers.setup_worker once Django is set up"""
+    global _worker_key_pool
+    # Each process keeps its own key pool, so split the per-key quota between them
+    _worker_key_pool = KeyPool(
+        configured_api_keys(),
+        quota=max(1, settings.CRUX_API_KEY_QUOTA // processes),
+        window=settings.CRUX_API_KEY_QUOTA_WINDOW,
+        max_wait=settings.CRUX_API_KEY_WAIT,
+    )
+
+
+def _executor(mode, workers):
+    if mode == 'process':
+        # By dotted path: unpickling this module in a spawned worker would import models before setup
+        return process_pool(workers, 'crux_api.batch._init_process_worker', (workers,))
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='crux-batch')
+
+
+def run_batch(urls, form_factor='ALL_FORM_FACTORS', workers=8, mode='thread', chunk_size=50,
+              persist=True, output=None, checkpoint=None, progress=None, key_wait=None):
+    """Analyze ``urls`` in parallel chunks, committing results in input order
+
+    Workers store reports as they go; results are written to ``output`` (a
+    text stream, as JSON lines) as each chunk completes in order, and
+    ``checkpoint`` records how many input URLs are done, so an interrupted
+    run resumes after the last committed chunk. Chunk sessions are named
+    after the run id saved in the checkpoint, so a resumed run (with the
+    same ``chunk_size``) finds the reports its in-flight chunks had already
+    stored instead of duplicating them. ``key_wait`` overrides
+    CRUX_API_KEY_WAIT for this run's calls, letting batch runs wait out the
+    per-key quota instead of failing URLs.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode: {mode}")
+    start_position = checkpoint.load() if checkpoint else 0
+    run_id = (checkpoint.run_id if checkpoint else None) or uuid.uuid4().hex
+    if checkpoint and checkpoint.run_id != run_id:
+        # Saved before any session exists, so a resume always finds its sessions
+        checkpoint.run_id = run_id
+        checkpoint.save(start_position)
+    urls = iter(urls)
+    if start_position:
+        logger.info("Resuming batch after %s URLs", start_position)
+        deque(islice(urls, start_position), maxlen=0)
+
+    stats = {'urls': 0, 'ok': 0, 'stale': 0, 'no_data': 0, 'failed': 0, 'resumed_from': start_position}
+    latencies = []
+
+    def commit(results, chunk_latencies):
+        if output is not None:
+            output.write(''.join(json.dumps(result.to_dict()) + '\n' for result in results))
+            output.flush()
+        for result in results:
+            stats[classify(result)] += 1
+        stats['urls'] += len(results)
+        latencies.extend(chunk_latencies)
+        if checkpoint:
+            checkpoint.save(start_position + stats['urls'])
+        if progress:
+            progress(stats)
+
+    def work_units():
+        position = start_position
+        for chunk in iter_chunks(urls, chunk_size):
+            yield chunk, form_factor, persist, chunk_session_id(run_id, position), key_wait
+            position += len(chunk)
+
+    if workers <= 1:
+        for args in work_units():
+            commit(*analyze_chunk(*args))
+    else:
+        with _executor(mode, workers) as executor:
+            # Bounded look-ahead also keeps the checkpoint close behind the workers
+            for _, result in iter_bounded(executor, analyze_chunk, work_units(), workers * 2):
+                commit(*result)
+
+    if checkpoint:
+        checkpoint.clear()
+    stats['latencies'] = latencies
+    return stats
@@ -0,0 +1,12 @@
+"""Benchmark suites run with ``manage.py benchmark <suite>``"""
+
+# Suite name -> module exposing add_arguments(parser) and run(options)
+SUITES = {
+    'analysis': 'crux_api.benchmarks.analysis',
+    'rendering': 'crux_api.benchmarks.rendering',
+    'keypool': 'crux_api.benchmarks.keypool',
+    'db_contention': 'crux_api.benchmarks.db_contention',
+    'logging': 'crux_api.benchmarks.log_overhead',
+    'memory': 'crux_api.benchmarks.memory',
+    'startup': 'crux_api.benchmarks.startup',
+}
@@ -0,0 +1,157 @@
+"""End-to-end analyze_urls throughput, DB write cost and summary cost against the simulator"""
+import logging
+import time
+
+from django.test import Client
+from django.test.utils import override_settings
+
+from crux_api.analysis import CruxAPIClient
+from crux_api.models import CruxReport
+from crux_api.results import summarize
+from crux_api.simulator import SimulatorConfig, fake_record, start_simulator
+
+from .common import benchmark_database, latency_metrics, stopwatch
+
+# analyze_urls accepts at most this many URLs per request
+URLS_PER_REQUEST = 10
+SIMULATOR_API_KEY = 'simulator-key-0000000000000000'
+
+
+def _parse_sizes(value):
+    return [int(size) for size in value.split(',') if size.strip()]
+
+
+def add_arguments(parser):
+    parser.add_argument('--sizes', type=_parse_sizes, default=[1, 10, 1000, 100000],
+                        help="Comma-separated URL counts for analyze_urls (default: 1,10,1000,100000)")
+    parser.add_argument('--summary-sizes', type=_parse_sizes, default=[10, 1000, 100000],
+                        help="Result counts for the summary-computation case")
+    parser.add_argument('--write-rows', type=int, default=5000, help="Rows for the DB write-cost cases")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Simulated upstream latency")
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--no-data-rate', type=float, default=0.1)
+
+
+def _urls(count, offset=0):
+    return [f"https://site{(offset + i) // 20}.example/page-{(offset + i) % 20}" for i in range(count)]
+
+
+def bench_analyze(client, size, offset):
+    latencies = []
+    urls = _urls(size, offset)
+    with stopwatch() as total:
+        for start in range(0, size, URLS_PER_REQUEST):
+            batch = urls[start:start + URLS_PER_REQUEST]
+            started = time.perf_counter()
+            response = client.post('/api/analyze/', {'urls': batch}, content_type='application/json')
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise RuntimeError(f"analyze_urls returned {response.status_code}: {response.content[:200]}")
+    return {
+        'name': f'analyze_urls[n={size}]',
+        'metrics': {
+            'urls': size,
+            'requests': len(latencies),
+            'urls_per_s': round(size / total['seconds'], 2),
+            **latency_metrics(latencies),
+        },
+    }
+
+
+def _report_rows(count, seed):
+    api_client = CruxAPIClient()
+    rows = []
+    for url in _urls(count):
+        api_response = fake_record(url, seed=seed)
+        processed = api_client.process_metrics(api_response, url, 'ALL_FORM_FACTORS')
+        values = {metric['metric_name']: metric['p75_value'] for metric in processed['metrics']}
+        rows.append(CruxReport(
+            url=url,
+            largest_contentful_paint=values.get('Largest Contentful Paint (LCP)'),
+            cumulative_layout_shift=values.get('Cumulative Layout Shift (CLS)'),
+            interaction_to_next_paint=values.get('Interaction to Next Paint (INP)'),
+            first_contentful_paint=values.get('First Contentful Paint (FCP)'),
+            api_response=api_response,
+        ))
+    return rows
+
+
+def bench_db_writes(count, seed):
+    cases = []
+    rows = _report_rows(count, seed)
+    with stopwatch() as timing:
+        for row in rows:
+            row.save()
+    cases.append({
+        'name': f'db_write_save[n={count}]',
+        'metrics': {'rows_per_s': round(count / timing['seconds'], 2), 'us_per_row': round(timing['seconds'] / count * 1e6, 2)},
+    })
+    CruxReport.objects.all().delete()
+
+    rows = _report_rows(count, seed)
+    with stopwatch() as timing:
+        CruxReport.objects.bulk_create(rows, batch_size=1000)
+    cases.append({
+        'name': f'db_write_bulk_create[n={count}]',
+        'metrics': {'rows_per_s': round(count / timing['seconds'], 2), 'us_per_row': round(timing['seconds'] / count * 1e6, 2)},
+    })
+    CruxReport.objects.all().delete()
+    return cases
+
+
+def bench_summary(count, seed):
+    api_client = CruxAPIClient()
+    results = [
+        api_client.parse_metrics(fake_record(url, seed=seed), url, 'ALL_FORM_FACTORS')
+        for url in _urls(count)
+    ]
+    with stopwatch() as timing:
+        summarize(results)
+    return {
+        'name': f'summary_statistics[n={count}]',
+        'metrics': {'ms': round(timing['seconds'] * 1000, 3), 'us_per_result': round(timing['seconds'] / count * 1e6, 3)},
+    }
+
+
+def run(options, log=print):
+    config = SimulatorConfig(
+        seed=options['seed'],
+        latency_ms=options['latency_ms'],
+        jitter_ms=options['jitter_ms'],
+        error_rate=options['error_rate'],
+        rate_limit_rate=options['rate_limit_rate'],
+        no_data_rate=options['no_data_rate'],
+    )
+    simulator = start_simulator(config=config)
+    cases = []
+    # Per-URL request logging would dominate the measurements
+    logging.disable(logging.WARNING)
+    try:
+        with benchmark_database(), override_settings(
+            CRUX_API_KEY=SIMULATOR_API_KEY, CRUX_API_URL=simulator.api_url,
+        ):
+            client = Client(HTTP_HOST='localhost')
+            offset = 0
+            for size in options['sizes']:
+                log(f"analyze_urls with {size} URLs...")
+                cases.append(bench_analyze(client, size, offset))
+                offset += size
+            log(f"DB writes with {options['write_rows']} rows...")
+            cases.extend(bench_db_writes(options['write_rows'], options['seed']))
+            for size in options['summary_sizes']:
+                log(f"summary statistics over {size} results...")
+                cases.append(bench_summary(size, options['seed']))
+    finally:
+        logging.disable(logging.NOTSET)
+        simulator.shutdown()
+        simulator.server_close()
+
+    return {
+        'sizes': options['sizes'],
+        'summary_sizes': options['summary_sizes'],
+        'write_rows': options['write_rows'],
+        'simulator': vars(config),
+    }, cases
@@ -0,0 +1,128 @@
+"""Timing, result and database helpers shared by the benchmark suites"""
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import django
+from django.db import connection
+
+
+def percentile(values, q):
+    """Linear-interpolated percentile (0-100) of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def latency_metrics(latencies_s):
+    """p50/p99/mean/max in milliseconds for a list of durations in seconds"""
+    millis = [value * 1000 for value in latencies_s]
+    return {
+        'p50_ms': round(percentile(millis, 50), 3),
+        'p99_ms': round(percentile(millis, 99), 3),
+        'mean_ms': round(sum(millis) / len(millis), 3),
+        'max_ms': round(max(millis), 3),
+    }
+
+
+@contextmanager
+def stopwatch():
+    """Yield a dict whose 'seconds' key is filled in when the block exits"""
+    timing = {}
+    started = time.perf_counter()
+    try:
+        yield timing
+    finally:
+        timing['seconds'] = time.perf_counter() - started
+
+
+@contextmanager
+def benchmark_database(file_backed=True):
+    """Run the block against a freshly migrated throwaway database
+
+    SQLite test databases default to in-memory, which hides commit cost, so
+    a temporary file is used unless ``file_backed`` is False.
+    """
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    previous_name = test_settings.get('NAME')
+    tmp_dir = None
+    if file_backed and connection.vendor == 'sqlite':
+        tmp_dir = tempfile.mkdtemp(prefix='crux-bench-')
+        test_settings['NAME'] = os.path.join(tmp_dir, 'bench.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = previous_name
+        if tmp_dir:
+            for name in os.listdir(tmp_dir):
+                os.remove(os.path.join(tmp_dir, name))
+            os.rmdir(tmp_dir)
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, timeout=5, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def build_report(suite, config, cases):
+    """Machine-readable benchmark report, stable enough to diff across releases"""
+    return {
+        'suite': suite,
+        'timestamp': datetime.now().isoformat(),
+        'git_revision': _git_revision(),
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'platform': platform.platform(),
+            'database': connection.vendor,
+        },
+        'config': config,
+        'cases': cases,
+    }
+
+
+def write_report(report, path):
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump(report, handle, indent=2, default=str)
+
+
+def _higher_is_better(metric):
+    return metric.endswith('_per_s') or metric.endswith('_ratio')
+
+
+def compare_reports(report, baseline, threshold_pct=10.0):
+    """List metrics that regressed by more than ``threshold_pct`` versus a baseline"""
+    previous = {case['name']: case['metrics'] for case in baseline.get('cases', [])}
+    regressions = []
+    for case in report['cases']:
+        for metric, value in case['metrics'].items():
+            old = previous.get(case['name'], {}).get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            change_pct = (value - old) / abs(old) * 100
+            worse = -change_pct if _higher_is_better(metric) else change_pct
+            if worse > threshold_pct:
+                regressions.append({
+                    'case': case['name'],
+                    'metric': metric,
+                    'baseline': old,
+                    'current': value,
+                    'change_pct': round(change_pct, 1),
+                })
+    return regressions
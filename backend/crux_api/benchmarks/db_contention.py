@@ -0,0 +1,110 @@
+"""Write throughput with N concurrent analyze requests, before and after the database tuning"""
+import logging
+import threading
+import time
+
+from django.db import close_old_connections, connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+
+from .common import benchmark_database, latency_metrics, stopwatch
+
+# Django's old defaults (rollback journal, full fsync, reconnect per request)
+# versus the tuned settings (CRUX_SQLITE_PRAGMAS and CRUX_DB_CONN_MAX_AGE)
+PROFILES = {
+    'default': {'pragmas': {'journal_mode': 'DELETE', 'synchronous': 'FULL'}, 'conn_max_age': 0},
+    'tuned': {'pragmas': None, 'conn_max_age': 60},
+}
+URLS_PER_REQUEST = 10
+
+
+def _parse_sizes(value):
+    return [int(size) for size in value.split(',') if size.strip()]
+
+
+def add_arguments(parser):
+    parser.add_argument('--workers', type=_parse_sizes, default=[1, 4, 8, 16],
+                        help="Comma-separated concurrent request counts (default: 1,4,8,16)")
+    parser.add_argument('--requests', type=int, default=50, help="analyze requests per worker")
+    parser.add_argument('--profiles', default=','.join(PROFILES),
+                        help=f"Comma-separated database profiles to compare ({', '.join(PROFILES)})")
+
+
+def _worker(worker_id, request_count, latencies, failures):
+    client = Client(HTTP_HOST='localhost')
+    try:
+        for i in range(request_count):
+            urls = [f"https://w{worker_id}.example/r{i}/p{j}" for j in range(URLS_PER_REQUEST)]
+            # The test client skips the request signals that recycle connections in production
+            close_old_connections()
+            started = time.perf_counter()
+            response = client.post('/api/analyze/', {'urls': urls}, content_type='application/json')
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                failures.append(response.status_code)
+            close_old_connections()
+    finally:
+        connections.close_all()
+
+
+def bench_contention(profile, workers, request_count):
+    latencies = []
+    failures = []
+    threads = [
+        threading.Thread(target=_worker, args=(worker_id, request_count, latencies, failures))
+        for worker_id in range(workers)
+    ]
+    with stopwatch() as total:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    requests_made = workers * request_count
+    succeeded = requests_made - len(failures)
+    return {
+        'name': f'db_contention[profile={profile},workers={workers}]',
+        'metrics': {
+            'requests': requests_made,
+            'failed_requests': len(failures),
+            'requests_per_s': round(succeeded / total['seconds'], 2),
+            # Each request writes one report per URL plus its session
+            'rows_per_s': round(succeeded * (URLS_PER_REQUEST + 1) / total['seconds'], 2),
+            **latency_metrics(latencies),
+        },
+    }
+
+
+def run(options, log=print):
+    profiles = [name.strip() for name in options['profiles'].split(',') if name.strip()]
+    unknown = set(profiles) - set(PROFILES)
+    if unknown:
+        raise ValueError(f"Unknown profiles: {', '.join(sorted(unknown))}")
+    if connection.vendor != 'sqlite':
+        log(f"Running against {connection.vendor}; the SQLite pragmas do not apply")
+
+    cases = []
+    logging.disable(logging.ERROR)
+    settings_dict = connection.settings_dict
+    previous_max_age = settings_dict.get('CONN_MAX_AGE', 0)
+    try:
+        for profile in profiles:
+            config = PROFILES[profile]
+            pragma_override = {'CRUX_SQLITE_PRAGMAS': config['pragmas']} if config['pragmas'] else {}
+            # Worker threads open their own connections from this shared settings dict
+            settings_dict['CONN_MAX_AGE'] = config['conn_max_age']
+            with override_settings(CRUX_API_KEY=None, CRUX_API_KEYS=[], **pragma_override), benchmark_database():
+                for workers in options['workers']:
+                    log(f"{profile}: {workers} concurrent worker(s) x {options['requests']} requests...")
+                    cases.append(bench_contention(profile, workers, options['requests']))
+    finally:
+        settings_dict['CONN_MAX_AGE'] = previous_max_age
+        logging.disable(logging.NOTSET)
+
+    return {
+        'workers': options['workers'],
+        'requests_per_worker': options['requests'],
+        'urls_per_request': URLS_PER_REQUEST,
+        'profiles': {name: PROFILES[name] for name in profiles},
+        'database': connection.vendor,
+    }, cases
@@ -0,0 +1,108 @@
+"""Upstream throughput versus the number of pooled API keys under a per-key quota"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test.utils import override_settings
+
+from crux_api.analysis import CruxAPIClient
+from crux_api.instrumentation import API_KEY_REQUESTS
+from crux_api.keypool import get_key_pool, key_fingerprint
+from crux_api.simulator import SimulatorConfig, start_simulator
+
+from .common import latency_metrics, stopwatch
+
+
+def _parse_sizes(value):
+    return [int(size) for size in value.split(',') if size.strip()]
+
+
+def add_arguments(parser):
+    parser.add_argument('--keys', type=_parse_sizes, default=[1, 2, 4],
+                        help="Comma-separated pool sizes to compare (default: 1,2,4)")
+    parser.add_argument('--urls', type=int, default=200, help="URLs fetched per pool size")
+    parser.add_argument('--quota', type=int, default=20, help="Calls per key per quota window")
+    parser.add_argument('--quota-window', type=float, default=1.0,
+                        help="Quota window in seconds; shortened from the real 60s to keep runs quick")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent fetches")
+    parser.add_argument('--latency-ms', type=float, default=5.0, help="Simulated upstream latency")
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def _rate_limited(keys):
+    return sum(API_KEY_REQUESTS.value(key=key_fingerprint(key), status='429') for key in keys)
+
+
+def bench_pool(size, options):
+    keys = [f'bench-key-{i:02d}-{"0" * 20}' for i in range(size)]
+    config = SimulatorConfig(
+        seed=options['seed'], latency_ms=options['latency_ms'],
+        quota=options['quota'], quota_window=options['quota_window'],
+    )
+    simulator = start_simulator(config=config)
+    urls = [f"https://site{i // 20}.example/page-{i % 20}" for i in range(options['urls'])]
+    try:
+        with override_settings(
+            CRUX_API_KEYS=keys, CRUX_API_URL=simulator.api_url,
+            CRUX_API_KEY_QUOTA=options['quota'], CRUX_API_KEY_QUOTA_WINDOW=options['quota_window'],
+            CRUX_API_KEY_WAIT=max(5.0, options['quota_window'] * 2),
+        ):
+            client = CruxAPIClient()
+            rate_limited_before = _rate_limited(keys)
+            latencies = []
+            errors = 0
+
+            def fetch(url):
+                started = time.perf_counter()
+                try:
+                    client.get_url_metrics(url)
+                    return time.perf_counter() - started, None
+                except Exception as e:
+                    return time.perf_counter() - started, e
+
+            with stopwatch() as total, ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                for seconds, error in pool.map(fetch, urls):
+                    latencies.append(seconds)
+                    errors += error is not None
+            usage = get_key_pool().snapshot()
+    finally:
+        simulator.shutdown()
+        simulator.server_close()
+
+    return {
+        'name': f'keypool[keys={size}]',
+        'metrics': {
+            'urls': len(urls),
+            'errors': errors,
+            'rate_limited': _rate_limited(keys) - rate_limited_before,
+            'urls_per_s': round(len(urls) / total['seconds'], 2),
+            'quota_per_s': round(size * options['quota'] / options['quota_window'], 2),
+            'busiest_key_share': round(max(key['calls_in_window'] for key in usage) / max(1, sum(key['calls_in_window'] for key in usage)), 3),
+            **latency_metrics(latencies),
+        },
+    }
+
+
+def run(options, log=print):
+    cases = []
+    logging.disable(logging.WARNING)
+    try:
+        for size in options['keys']:
+            log(f"Fetching {options['urls']} URLs with {size} key(s)...")
+            cases.append(bench_pool(size, options))
+    finally:
+        logging.disable(logging.NOTSET)
+
+    baseline = cases[0]['metrics']['urls_per_s'] / options['keys'][0] if cases else None
+    for case, size in zip(cases, options['keys']):
+        # 1.0 means throughput grew exactly in proportion to the number of keys
+        case['metrics']['scaling_ratio'] = round(case['metrics']['urls_per_s'] / (baseline * size), 3)
+
+    return {
+        'keys': options['keys'],
+        'urls': options['urls'],
+        'quota': options['quota'],
+        'quota_window': options['quota_window'],
+        'concurrency': options['concurrency'],
+        'latency_ms': options['latency_ms'],
+    }, cases
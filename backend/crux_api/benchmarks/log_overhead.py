@@ -0,0 +1,225 @@
+"""Request-path cost of logging: the old synchronous DEBUG console setup versus queued JSON logging
+
+Queueing and sampling are measured separately: sync_json and async_json
+differ only in the handler, async_json and async_json_sampled only in the
+sampling filter. The slow-sink cases repeat sync_json and async_json with
+a delay on every write, which is where queueing pays off.
+"""
+import logging
+import os
+import tempfile
+import time
+
+from django.test import Client
+from django.test.utils import override_settings
+
+from crux_api.instrumentation import LOG_RECORDS_DROPPED
+from crux_api.logs import AsyncStreamHandler, JSONFormatter, SamplingFilter
+from crux_api.simulator import SimulatorConfig, start_simulator
+
+from .analysis import SIMULATOR_API_KEY, URLS_PER_REQUEST, _urls
+from .common import benchmark_database, latency_metrics, stopwatch
+
+# profile -> (queued, format, level, sampled); sync_text_debug is the settings.LOGGING of earlier releases
+PROFILES = {
+    'sync_text_debug': (False, 'text', logging.DEBUG, False),
+    'sync_json': (False, 'json', logging.INFO, False),
+    'async_json': (True, 'json', logging.INFO, False),
+    'async_json_sampled': (True, 'json', logging.INFO, True),
+}
+# Compared with and without a slow sink: the same setup except for the queue
+SLOW_SINK_PROFILES = ('sync_json', 'async_json')
+
+
+def add_arguments(parser):
+    parser.add_argument('--urls', type=int, default=1000, help="URLs analyzed per profile")
+    parser.add_argument('--calls', type=int, default=50000, help="Log calls for the per-call cases")
+    parser.add_argument('--slow-calls', type=int, default=2000, help="Log calls for the slow-sink per-call cases")
+    parser.add_argument('--sample-rates', default='crux_api.analysis=0.1',
+                        help="CRUX_LOG_SAMPLE_RATES for the sampled profile (default: crux_api.analysis=0.1)")
+    parser.add_argument('--write-latency-ms', type=float, default=1.0,
+                        help="Added to every write in the slow-sink cases, to mimic a slow terminal, pipe "
+                             "or log shipper (default: 1)")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="Simulated upstream latency")
+    parser.add_argument('--seed', type=int, default=0)
+
+
+class _SlowFile:
+    """File wrapper whose writes take at least ``latency`` seconds"""
+
+    def __init__(self, handle, latency):
+        self.handle = handle
+        self.latency = latency
+
+    def write(self, text):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.handle.write(text)
+
+    def flush(self):
+        self.handle.flush()
+
+
+def _handler(profile, stream, sample_rates):
+    queued, fmt, level, sampled = PROFILES[profile]
+    handler = AsyncStreamHandler(stream) if queued else logging.StreamHandler(stream)
+    handler.setFormatter(JSONFormatter() if fmt == 'json' else logging.Formatter('%(message)s'))
+    if sampled:
+        handler.addFilter(SamplingFilter(sample_rates))
+    return handler, level
+
+
+class _logging_profile:
+    """Route the crux_api logger through one profile's handler, writing to a temp file"""
+
+    def __init__(self, profile, options, write_latency_ms=0.0):
+        self.profile = profile
+        self.options = options
+        self.write_latency = write_latency_ms / 1000
+
+    def __enter__(self):
+        self.logger = logging.getLogger('crux_api')
+        self.saved = (self.logger.handlers[:], self.logger.level, self.logger.propagate)
+        fd, self.path = tempfile.mkstemp(prefix='crux-log-bench-', suffix='.log')
+        self.file = os.fdopen(fd, 'w', encoding='utf-8')
+        stream = _SlowFile(self.file, self.write_latency)
+        self.handler, level = _handler(self.profile, stream, self.options['sample_rates'])
+        self.logger.handlers = [self.handler]
+        self.logger.setLevel(level)
+        self.logger.propagate = False
+        return self
+
+    def drain(self):
+        """Wait for queued records, returning how many lines were written"""
+        self.handler.flush()
+        self.file.flush()
+        with open(self.path, 'r', encoding='utf-8') as handle:
+            return sum(1 for _ in handle)
+
+    def __exit__(self, *exc):
+        self.handler.close()
+        self.file.close()
+        os.remove(self.path)
+        self.logger.handlers, level, self.logger.propagate = self.saved
+        self.logger.setLevel(level)
+
+
+def _case_name(kind, profile, slow_sink):
+    return f"{kind}[profile={profile}{',sink=slow' if slow_sink else ''}]"
+
+
+def bench_requests(profile, options, offset, slow_sink=False):
+    client = Client(HTTP_HOST='localhost')
+    urls = _urls(options['urls'], offset)
+    latencies = []
+    write_latency_ms = options['write_latency_ms'] if slow_sink else 0.0
+    with _logging_profile(profile, options, write_latency_ms) as logs:
+        dropped_before = LOG_RECORDS_DROPPED.total()
+        with stopwatch() as total:
+            for start in range(0, len(urls), URLS_PER_REQUEST):
+                started = time.perf_counter()
+                response = client.post('/api/analyze/', {'urls': urls[start:start + URLS_PER_REQUEST]},
+                                       content_type='application/json')
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise RuntimeError(f"analyze_urls returned {response.status_code}: {response.content[:200]}")
+        written = logs.drain()
+    return {
+        'name': _case_name('log_requests', profile, slow_sink),
+        'metrics': {
+            'urls': len(urls),
+            'urls_per_s': round(len(urls) / total['seconds'], 2),
+            'records_written': written,
+            'records_dropped': LOG_RECORDS_DROPPED.total() - dropped_before,
+            **latency_metrics(latencies),
+        },
+    }
+
+
+def bench_calls(profile, options, slow_sink=False):
+    """Caller-side cost of one enabled logger.info call with arguments"""
+    logger = logging.getLogger('crux_api.analysis')
+    calls = options['slow_calls'] if slow_sink else options['calls']
+    write_latency_ms = options['write_latency_ms'] if slow_sink else 0.0
+    dropped_before = LOG_RECORDS_DROPPED.total()
+    with _logging_profile(profile, options, write_latency_ms) as logs:
+        with stopwatch() as total:
+            for i in range(calls):
+                logger.info("CrUX API response status: %s for %s", 200, 'URL-based query',
+                            extra={'url': f'https://site{i}.example/', 'status': 200})
+        caller_seconds = total['seconds']
+        with stopwatch() as drained:
+            written = logs.drain()
+    return {
+        'name': _case_name('log_call', profile, slow_sink),
+        'metrics': {
+            'calls': calls,
+            'caller_us_per_call': round(caller_seconds / calls * 1e6, 3),
+            'drain_ms': round(drained['seconds'] * 1000, 3),
+            'records_written': written,
+            'records_dropped': LOG_RECORDS_DROPPED.total() - dropped_before,
+        },
+    }
+
+
+def bench_disabled_calls(options):
+    """A filtered-out debug call with an eager f-string versus lazy arguments"""
+    logger = logging.getLogger('crux_api.analysis')
+    payload = {'url': 'https://site.example/', 'metrics': ['largest_contentful_paint'] * 4}
+    calls = options['calls']
+    cases = []
+    previous = logger.level
+    logger.setLevel(logging.INFO)
+    try:
+        for style in ('eager', 'lazy'):
+            with stopwatch() as total:
+                if style == 'eager':
+                    for _ in range(calls):
+                        logger.debug(f"Using metrics: {payload}")
+                else:
+                    for _ in range(calls):
+                        logger.debug("Using metrics: %s", payload)
+            cases.append({
+                'name': f'log_disabled_call[style={style}]',
+                'metrics': {'calls': calls, 'caller_us_per_call': round(total['seconds'] / calls * 1e6, 3)},
+            })
+    finally:
+        logger.setLevel(previous)
+    return cases
+
+
+def run(options, log=print):
+    simulator = start_simulator(config=SimulatorConfig(seed=options['seed'], latency_ms=options['latency_ms']))
+    cases = []
+    try:
+        with benchmark_database(), override_settings(CRUX_API_KEY=SIMULATOR_API_KEY, CRUX_API_URL=simulator.api_url):
+            offset = 0
+            for profile in PROFILES:
+                log(f"{profile}: analyze_urls with {options['urls']} URLs...")
+                cases.append(bench_requests(profile, options, offset))
+                offset += options['urls']
+            for profile in SLOW_SINK_PROFILES:
+                log(f"{profile}, {options['write_latency_ms']} ms per write: analyze_urls with {options['urls']} URLs...")
+                cases.append(bench_requests(profile, options, offset, slow_sink=True))
+                offset += options['urls']
+        for profile in PROFILES:
+            log(f"{profile}: {options['calls']} log calls...")
+            cases.append(bench_calls(profile, options))
+        for profile in SLOW_SINK_PROFILES:
+            log(f"{profile}, {options['write_latency_ms']} ms per write: {options['slow_calls']} log calls...")
+            cases.append(bench_calls(profile, options, slow_sink=True))
+        log("Disabled debug calls, eager versus lazy formatting...")
+        cases.extend(bench_disabled_calls(options))
+    finally:
+        simulator.shutdown()
+        simulator.server_close()
+
+    return {
+        'profiles': list(PROFILES),
+        'urls': options['urls'],
+        'calls': options['calls'],
+        'slow_calls': options['slow_calls'],
+        'sample_rates': options['sample_rates'],
+        'write_latency_ms': options['write_latency_ms'],
+        'latency_ms': options['latency_ms'],
+    }, cases
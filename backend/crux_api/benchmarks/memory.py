@@ -0,0 +1,97 @@
+"""Memory held by large result sets: per-row dicts versus compact AnalysisResult objects"""
+import pickle
+import tracemalloc
+
+from crux_api.analysis import CruxAPIClient
+from crux_api.results import summarize
+from crux_api.simulator import fake_record
+
+from .analysis import _urls
+from .common import stopwatch
+
+# How results were held before AnalysisResult, and how they are held now
+REPRESENTATIONS = ('dict', 'compact')
+
+
+def _summarize_dicts(results):
+    """The per-row dict summary AnalysisResult and results.summarize replaced, kept as the baseline"""
+    groups = {}
+    for result in results:
+        for metric in result.get('metrics', []):
+            if metric.get('metric_name') and metric.get('p75_value') is not None:
+                groups.setdefault(metric['metric_name'], []).append(
+                    {'value': float(metric['p75_value']), 'url': result.get('url', '')}
+                )
+    summary = []
+    for metric_name, values in groups.items():
+        best = min(values, key=lambda item: item['value'])
+        worst = max(values, key=lambda item: item['value'])
+        summary.append({
+            'metric_name': metric_name,
+            'average_p75': round(sum(item['value'] for item in values) / len(values), 2),
+            'best_url': best['url'],
+            'worst_url': worst['url'],
+            'best_value': round(best['value'], 2),
+            'worst_value': round(worst['value'], 2),
+        })
+    return summary
+
+
+def _parse_sizes(value):
+    return [int(size) for size in value.split(',') if size.strip()]
+
+
+def add_arguments(parser):
+    parser.add_argument('--sizes', type=_parse_sizes, default=[1000, 100000],
+                        help="Comma-separated result counts (default: 1000,100000)")
+    parser.add_argument('--chunk-size', type=int, default=50,
+                        help="Results per pickled chunk, as analyze_batch --mode process sends them back")
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def bench_results(representation, size, options):
+    api_client = CruxAPIClient()
+    parse = api_client.process_metrics if representation == 'dict' else api_client.parse_metrics
+    urls = _urls(size)
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        with stopwatch() as build:
+            results = [parse(fake_record(url, seed=options['seed']), url, 'ALL_FORM_FACTORS') for url in urls]
+        retained, _ = tracemalloc.get_traced_memory()
+        summarize_results = _summarize_dicts if representation == 'dict' else summarize
+        summarize_results(results)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # Timed again untraced; tracemalloc slows allocation-heavy code unevenly
+    with stopwatch() as summary:
+        summarize_results(results)
+    chunk = results[:options['chunk_size']]
+    pickled = len(pickle.dumps(chunk, protocol=pickle.HIGHEST_PROTOCOL))
+    del results
+    return {
+        'name': f'results[repr={representation},n={size}]',
+        'metrics': {
+            'results': size,
+            'retained_mb': round((retained - baseline) / 2**20, 3),
+            'peak_mb': round((peak - baseline) / 2**20, 3),
+            'bytes_per_result': round((retained - baseline) / size),
+            'pickled_bytes_per_result': round(pickled / len(chunk)),
+            'build_ms_traced': round(build['seconds'] * 1000, 3),
+            'summary_ms': round(summary['seconds'] * 1000, 3),
+        },
+    }
+
+
+def run(options, log=print):
+    cases = []
+    for size in options['sizes']:
+        for representation in REPRESENTATIONS:
+            log(f"{representation}: holding {size} results...")
+            cases.append(bench_results(representation, size, options))
+    return {
+        'sizes': options['sizes'],
+        'chunk_size': options['chunk_size'],
+        'representations': list(REPRESENTATIONS),
+    }, cases
@@ -0,0 +1,101 @@
+"""Payload size and render time of the JSON renderers for large batch and history responses"""
+import gzip
+import time
+from datetime import datetime, timedelta
+
+from rest_framework.renderers import JSONRenderer
+
+from crux_api.analysis import CruxAPIClient
+from crux_api.renderers import CompactJSONRenderer, FastJSONRenderer, orjson
+from crux_api.results import summarize
+from crux_api.simulator import fake_record
+
+from .common import latency_metrics
+
+RENDERERS = {
+    'drf_json': JSONRenderer,
+    'fast_json': FastJSONRenderer,
+    'compact': CompactJSONRenderer,
+}
+
+
+def _parse_sizes(value):
+    return [int(size) for size in value.split(',') if size.strip()]
+
+
+def add_arguments(parser):
+    parser.add_argument('--sizes', type=_parse_sizes, default=[10, 1000, 100000],
+                        help="Comma-separated result counts per payload (default: 10,1000,100000)")
+    parser.add_argument('--repeat', type=int, default=5, help="Renders per case; latencies are per render")
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def batch_payload(count, seed):
+    """An analyze_urls response with ``count`` results and their summary"""
+    api_client = CruxAPIClient()
+    created_at = datetime(2024, 1, 1)
+    results = []
+    for i in range(count):
+        url = f"https://site{i // 20}.example/page-{i % 20}"
+        result = api_client.parse_metrics(fake_record(url, seed=seed), url, 'ALL_FORM_FACTORS')
+        result.created_at = created_at
+        results.append(result)
+    return {
+        'session_id': '00000000-0000-0000-0000-000000000000',
+        'results': [result.to_dict() for result in results],
+        'summary': summarize(results),
+    }
+
+
+def history_payload(count):
+    """A get_analysis_history response with ``count`` rows"""
+    started = datetime(2024, 1, 1)
+    return [
+        {
+            'id': i,
+            'url': f"https://site{i // 20}.example/page-{i % 20}",
+            'form_factor': 'PHONE' if i % 2 else 'DESKTOP',
+            'overall_performance': 'Good' if i % 3 else 'Needs Improvement',
+            'created_at': (started + timedelta(minutes=i)).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+def bench_render(kind, count, payload, repeat):
+    cases = []
+    baseline_bytes = None
+    for name, renderer_class in RENDERERS.items():
+        renderer = renderer_class()
+        latencies = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            body = renderer.render(payload, renderer.media_type, {})
+            latencies.append(time.perf_counter() - started)
+        compressed = gzip.compress(body, compresslevel=6)
+        baseline_bytes = baseline_bytes or len(body)
+        cases.append({
+            'name': f'render_{kind}[renderer={name},n={count}]',
+            'metrics': {
+                'bytes': len(body),
+                'gzip_bytes': len(compressed),
+                'size_reduction_ratio': round(baseline_bytes / len(body), 3),
+                'gzip_reduction_ratio': round(baseline_bytes / len(compressed), 3),
+                **latency_metrics(latencies),
+            },
+        })
+    return cases
+
+
+def run(options, log=print):
+    cases = []
+    for size in options['sizes']:
+        log(f"Rendering analyze_urls payload with {size} results...")
+        cases.extend(bench_render('batch', size, batch_payload(size, options['seed']), options['repeat']))
+        log(f"Rendering history payload with {size} rows...")
+        cases.extend(bench_render('history', size, history_payload(size), options['repeat']))
+    return {
+        'sizes': options['sizes'],
+        'repeat': options['repeat'],
+        'orjson': orjson is not None,
+    }, cases
@@ -0,0 +1,176 @@
+"""Cold-start cost of a worker: import-time breakdown, WSGI load and first requests, with and without warm-up"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+from django.conf import settings
+
+from crux_api.simulator import start_simulator
+
+from .analysis import SIMULATOR_API_KEY
+
+PROFILES = ('lazy', 'warmup')
+# Endpoint name -> (method, path, JSON body)
+ENDPOINTS = {
+    'health': ('GET', '/api/health/', None),
+    'history': ('GET', '/api/history/', None),
+    'analyze': ('POST', '/api/analyze/', {'urls': ['https://site0.example/']}),
+}
+PHASE_MARKER = 'crux-startup-phase:'
+
+# Runs in a fresh interpreter: load the WSGI app, then send two requests straight to it
+CHILD_SCRIPT = r'''
+import io, json, sys, time
+from wsgiref.util import setup_testing_defaults
+
+method, path, body = sys.argv[1], sys.argv[2], sys.argv[3].encode()
+started = time.perf_counter()
+from crux_project.wsgi import application
+loaded = time.perf_counter()
+from crux_api.startup import process_uptime, startup_snapshot
+
+
+def call():
+    environ = {
+        'REQUEST_METHOD': method, 'PATH_INFO': path, 'HTTP_HOST': 'localhost',
+        'CONTENT_TYPE': 'application/json', 'CONTENT_LENGTH': str(len(body)), 'wsgi.input': io.BytesIO(body),
+    }
+    setup_testing_defaults(environ)
+    statuses = []
+    began = time.perf_counter()
+    result = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    try:
+        b''.join(result)
+    finally:
+        result.close()
+    return time.perf_counter() - began, int(statuses[0].split()[0])
+
+
+sys.stderr.write('%sfirst_request\n' % sys.argv[4])
+first, status = call()
+sys.stderr.write('%ssecond_request\n' % sys.argv[4])
+second, _ = call()
+print(json.dumps({
+    'wsgi_load_s': loaded - started,
+    'first_request_s': first,
+    'second_request_s': second,
+    'status': status,
+    'startup': startup_snapshot(),
+    'modules_loaded': len(sys.modules),
+    'requests_loaded': 'requests' in sys.modules,
+}))
+'''
+
+
+def add_arguments(parser):
+    parser.add_argument('--repeat', type=int, default=5, help="Fresh processes per profile and endpoint (median is reported)")
+    parser.add_argument('--top', type=int, default=10, help="Packages listed in each import-time breakdown")
+
+
+def parse_importtime(stderr):
+    """Self import time in ms per top-level package, per phase (startup, first_request, second_request)"""
+    phases = defaultdict(lambda: defaultdict(float))
+    phase = 'startup'
+    for line in stderr.splitlines():
+        if line.startswith(PHASE_MARKER):
+            phase = line[len(PHASE_MARKER):].strip()
+        elif line.startswith('import time:') and not line.endswith('imported package'):
+            self_us, _, name = line[len('import time:'):].split('|')
+            phases[phase][name.strip().split('.')[0]] += int(self_us) / 1000
+    return phases
+
+
+def _child_env(profile, db_path, simulator):
+    env = dict(os.environ)
+    env.update({
+        'DJANGO_SETTINGS_MODULE': 'crux_project.settings',
+        'CRUX_DB_ENGINE': 'sqlite',
+        'CRUX_DB_NAME': db_path,
+        'CRUX_API_KEY': SIMULATOR_API_KEY,
+        'CRUX_API_KEYS': '',
+        'CRUX_API_URL': simulator.api_url,
+        'CRUX_WARMUP': 'true' if profile == 'warmup' else 'false',
+        'CRUX_LOG_LEVEL': 'WARNING',
+    })
+    return env
+
+
+def run_child(endpoint, env):
+    method, path, body = ENDPOINTS[endpoint]
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT, method, path,
+         json.dumps(body) if body is not None else '', PHASE_MARKER],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=False,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Startup child failed for {endpoint}: {completed.stderr[-2000:]}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    if result['status'] != 200:
+        raise RuntimeError(f"{endpoint} returned {result['status']} in the startup child")
+    return result, parse_importtime(completed.stderr)
+
+
+def _median(values):
+    return round(statistics.median(values), 3)
+
+
+def bench_startup(profile, endpoint, env, options):
+    runs = [run_child(endpoint, env) for _ in range(options['repeat'])]
+    results = [result for result, _ in runs]
+    imports = [phases for _, phases in runs]
+    cases = [{
+        'name': f'startup[profile={profile},endpoint={endpoint}]',
+        'metrics': {
+            'wsgi_load_ms': _median([result['wsgi_load_s'] * 1000 for result in results]),
+            'first_request_ms': _median([result['first_request_s'] * 1000 for result in results]),
+            'second_request_ms': _median([result['second_request_s'] * 1000 for result in results]),
+            'time_to_first_request_ms': _median([result['startup']['time_to_first_request'] for result in results]),
+            'warmup_ms': _median([result['startup'].get('warmup', 0.0) for result in results]),
+            'startup_import_ms': _median([sum(phases['startup'].values()) for phases in imports]),
+            'first_request_import_ms': _median([sum(phases['first_request'].values()) for phases in imports]),
+            'modules_loaded': results[-1]['modules_loaded'],
+            'requests_loaded': int(results[-1]['requests_loaded']),
+        },
+    }]
+    for phase in ('startup', 'first_request'):
+        packages = {name for phases in imports for name in phases[phase]}
+        medians = {name: _median([phases[phase].get(name, 0.0) for phases in imports]) for name in packages}
+        top = sorted(medians.items(), key=lambda item: item[1], reverse=True)[:options['top']]
+        if top:
+            cases.append({
+                'name': f'imports[profile={profile},endpoint={endpoint},phase={phase}]',
+                'metrics': {f'{name}_ms': ms for name, ms in top},
+            })
+    return cases
+
+
+def run(options, log=print):
+    simulator = start_simulator()
+    tmp_dir = tempfile.mkdtemp(prefix='crux-startup-')
+    db_path = os.path.join(tmp_dir, 'startup.sqlite3')
+    cases = []
+    try:
+        env = _child_env('lazy', db_path, simulator)
+        subprocess.run([sys.executable, 'manage.py', 'migrate', '--verbosity', '0'],
+                       cwd=settings.BASE_DIR, env=env, check=True)
+        for profile in PROFILES:
+            env = _child_env(profile, db_path, simulator)
+            for endpoint in ENDPOINTS:
+                log(f"{profile}: {options['repeat']} cold starts, first request to {endpoint}...")
+                cases.extend(bench_startup(profile, endpoint, env, options))
+    finally:
+        simulator.shutdown()
+        simulator.server_close()
+        for name in os.listdir(tmp_dir):
+            os.remove(os.path.join(tmp_dir, name))
+        os.rmdir(tmp_dir)
+
+    return {
+        'profiles': list(PROFILES),
+        'endpoints': list(ENDPOINTS),
+        'repeat': options['repeat'],
+    }, cases
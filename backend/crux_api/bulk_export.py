@@ -0,0 +1,217 @@
+"""Streaming CSV, JSONL and Parquet writers for CrUX report exports"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+
+from django.db.models import Avg, Count, Max, Min
+from django.db.models.functions import TruncMonth
+
+from .models import CruxReport
+
+EXPORT_FORMATS = ('csv', 'jsonl', 'parquet')
+DATASETS = ('reports', 'rollup')
+
+METRIC_FIELDS = (
+    'largest_contentful_paint',
+    'first_input_delay',
+    'cumulative_layout_shift',
+    'first_contentful_paint',
+    'interaction_to_next_paint',
+    'time_to_first_byte',
+)
+
+REPORT_COLUMNS = ('id', 'url', 'canonical_url', 'form_factor') + METRIC_FIELDS + ('created_at',)
+ROLLUP_COLUMNS = ('canonical_url', 'form_factor', 'period', 'report_count', 'first_seen', 'last_seen') + tuple(
+    f'avg_{field}' for field in METRIC_FIELDS
+)
+TIMESTAMP_COLUMNS = ('created_at', 'period', 'first_seen', 'last_seen')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+# Rows fetched per database round trip; also the Parquet row group size
+CHUNK_SIZE = 2000
+# Text output is buffered up to this many bytes before being yielded
+FLUSH_BYTES = 64 * 1024
+
+
+def export_rows(queryset, dataset='reports'):
+    """Return (columns, row iterator) for a dataset over a filtered queryset
+
+    Rows are tuples streamed with iterator(), which uses server-side cursors
+    where the database supports them, so memory stays flat.
+    """
+    if dataset == 'reports':
+        columns = REPORT_COLUMNS
+        rows = queryset.order_by('id').values_list(*columns)
+    elif dataset == 'rollup':
+        columns = ROLLUP_COLUMNS
+        averages = {f'avg_{field}': Avg(field) for field in METRIC_FIELDS}
+        rows = (
+            queryset.order_by()
+            .annotate(period=TruncMonth('created_at'))
+            .values('url_key', 'canonical_url', 'form_factor', 'period')
+            .annotate(
+                report_count=Count('id'),
+                first_seen=Min('created_at'),
+                last_seen=Max('created_at'),
+                **averages,
+            )
+            .order_by('canonical_url', 'form_factor', 'period')
+            .values_list(*columns)
+        )
+    else:
+        raise ValueError(f"Unknown dataset: {dataset}")
+    return columns, rows.iterator(chunk_size=CHUNK_SIZE)
+
+
+def _serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_serialize(value) for value in row])
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_jsonl(columns, rows):
+    parts = []
+    size = 0
+    for row in rows:
+        line = json.dumps({column: _serialize(value) for column, value in zip(columns, row)})
+        parts.append(line)
+        size += len(line) + 1
+        if size >= FLUSH_BYTES:
+            yield ('\n'.join(parts) + '\n').encode('utf-8')
+            parts = []
+            size = 0
+    if parts:
+        yield ('\n'.join(parts) + '\n').encode('utf-8')
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to a generator"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _parquet_schema(pa, columns):
+    fields = []
+    for column in columns:
+        if column in TIMESTAMP_COLUMNS:
+            fields.append(pa.field(column, pa.timestamp('us', tz='UTC')))
+        elif column in ('id', 'report_count'):
+            fields.append(pa.field(column, pa.int64()))
+        elif column in ('url', 'canonical_url', 'form_factor'):
+            fields.append(pa.field(column, pa.string()))
+        else:
+            fields.append(pa.field(column, pa.float64()))
+    return pa.schema(fields)
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise ImportError("Parquet export requires the 'pyarrow' package") from exc
+    return pyarrow, pyarrow.parquet
+
+
+def iter_parquet(columns, rows):
+    pa, pq = _require_pyarrow()
+    schema = _parquet_schema(pa, columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+
+    def write_batch(batch):
+        table = pa.Table.from_pylist([dict(zip(columns, row)) for row in batch], schema=schema)
+        writer.write_table(table)
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= CHUNK_SIZE:
+            write_batch(batch)
+            batch = []
+            yield sink.drain()
+    if batch:
+        write_batch(batch)
+    writer.close()
+    yield sink.drain()
+
+
+WRITERS = {
+    'csv': iter_csv,
+    'jsonl': iter_jsonl,
+    'parquet': iter_parquet,
+}
+
+
+def gzip_stream(chunks, level=6):
+    """Compress a byte stream into gzip format on the fly"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(queryset=None, dataset='reports', fmt='csv', compress=False):
+    """Yield the encoded export of a (filtered) CruxReport queryset"""
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if fmt == 'parquet':
+        # Fail before the first byte is sent rather than mid-stream
+        _require_pyarrow()
+    if queryset is None:
+        queryset = CruxReport.objects.all()
+    columns, rows = export_rows(queryset, dataset)
+    chunks = WRITERS[fmt](columns, rows)
+    if compress:
+        chunks = gzip_stream(chunks)
+    return chunks
+
+
+def export_filename(dataset, fmt, compress=False):
+    name = f"crux_{dataset}_{datetime.now().strftime('%Y%m%d%H%M%S')}.{fmt}"
+    return f"{name}.gz" if compress else name
@@ -0,0 +1,395 @@
+"""Streaming readers and row mapping for CrUX BigQuery export files"""
+import csv
+import gzip
+import hashlib
+import json
+import logging
+import os
+from collections import deque
+from datetime import datetime, date, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .canonical import canonical_fields
+from .models import CruxReport, ImportCheckpoint
+from .workers import process_pool
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FORMATS = ('csv', 'jsonl', 'parquet')
+
+# Export column names that map onto each CruxReport metric field. Both the
+# model field names and the p75_* columns of the CrUX BigQuery materialized
+# tables are accepted.
+METRIC_COLUMNS = {
+    'largest_contentful_paint': ('largest_contentful_paint', 'p75_lcp', 'lcp'),
+    'first_input_delay': ('first_input_delay', 'p75_fid', 'fid'),
+    'cumulative_layout_shift': ('cumulative_layout_shift', 'p75_cls', 'cls'),
+    'first_contentful_paint': ('first_contentful_paint', 'p75_fcp', 'fcp'),
+    'interaction_to_next_paint': ('interaction_to_next_paint', 'p75_inp', 'inp'),
+    'time_to_first_byte': ('time_to_first_byte', 'p75_ttfb', 'ttfb'),
+}
+URL_COLUMNS = ('url', 'origin', 'page')
+FORM_FACTOR_COLUMNS = ('form_factor', 'formFactor', 'device')
+DATE_COLUMNS = ('created_at', 'date', 'yyyymm')
+# CruxReport columns written by bulk_insert_reports, in parameter order
+IMPORT_COLUMNS = ('url', 'canonical_url', 'url_key', 'form_factor', *METRIC_COLUMNS, 'created_at', 'api_response')
+# Leading bytes hashed, together with the size, to recognise an export file
+FINGERPRINT_BYTES = 1 << 20
+
+FORM_FACTORS = {
+    'phone': 'PHONE',
+    'mobile': 'PHONE',
+    'desktop': 'DESKTOP',
+    'tablet': 'TABLET',
+    'all_form_factors': 'ALL_FORM_FACTORS',
+    'all': 'ALL_FORM_FACTORS',
+}
+
+
+def detect_format(path):
+    """Guess the export format from the file extension"""
+    name = path.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    for fmt, extensions in (('csv', ('.csv',)), ('jsonl', ('.jsonl', '.ndjson', '.json')), ('parquet', ('.parquet', '.pq'))):
+        if name.endswith(extensions):
+            return fmt
+    raise ValueError(f"Cannot detect export format for {path}; pass --format explicitly")
+
+
+def _open_text(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', newline='')
+    return open(path, 'r', encoding='utf-8', newline='')
+
+
+def iter_raw_records(path, fmt, batch_size=10000):
+    """Yield raw records from an export file one at a time without loading it fully
+
+    CSV rows are yielded as dicts, JSONL rows as undecoded strings (decoding
+    is left to map_record so it can run in a worker process) and Parquet rows
+    as dicts read one record batch at a time.
+    """
+    if fmt == 'csv':
+        with _open_text(path) as handle:
+            yield from csv.DictReader(handle)
+    elif fmt == 'jsonl':
+        with _open_text(path) as handle:
+            for line in handle:
+                if line.strip():
+                    yield line
+    elif fmt == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("Parquet support requires the 'pyarrow' package") from exc
+        parquet_file = pq.ParquetFile(path)
+        for record_batch in parquet_file.iter_batches(batch_size=batch_size):
+            yield from record_batch.to_pylist()
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+
+def _first(record, columns):
+    for column in columns:
+        value = record.get(column)
+        if value not in (None, ''):
+            return value
+    return None
+
+
+def _parse_float(value):
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_created_at(value):
+    """Parse an ISO timestamp, a date or a BigQuery yyyymm integer"""
+    if value in (None, ''):
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, date):
+        parsed = datetime(value.year, value.month, value.day)
+    else:
+        text = str(value).strip()
+        if text.isdigit() and len(text) == 6:
+            parsed = datetime(int(text[:4]), int(text[4:]), 1)
+        else:
+            parsed = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def map_record(raw, source=None, keep_raw=False):
+    """Map one raw export record onto CruxReport field values
+
+    Returns None for records that have no URL or cannot be parsed.
+    """
+    try:
+        record = json.loads(raw) if isinstance(raw, str) else raw
+    except ValueError:
+        return None
+    if not isinstance(record, dict):
+        return None
+
+    url = _first(record, URL_COLUMNS)
+    if not url:
+        return None
+
+    form_factor = _first(record, FORM_FACTOR_COLUMNS) or 'ALL_FORM_FACTORS'
+    form_factor = FORM_FACTORS.get(str(form_factor).lower(), str(form_factor).upper())
+
+    try:
+        created_at = _parse_created_at(_first(record, DATE_COLUMNS))
+    except ValueError:
+        return None
+
+    url = str(url)[:500]
+    fields = {
+        'url': url,
+        **canonical_fields(url),
+        'form_factor': form_factor[:20],
+        'api_response': {'source': source or 'bigquery_export'},
+    }
+    if created_at is not None:
+        fields['created_at'] = created_at
+    if keep_raw:
+        # Serialized with default=str on insert, so dates from Parquet survive
+        fields['api_response']['record'] = record
+    for field_name, columns in METRIC_COLUMNS.items():
+        fields[field_name] = _parse_float(_first(record, columns))
+    return fields
+
+
+def insert_values(fields, default_created_at):
+    """IMPORT_COLUMNS parameters for one mapped record"""
+    return (
+        *(fields.get(column) for column in IMPORT_COLUMNS[:-2]),
+        connection.ops.adapt_datetimefield_value(fields.get('created_at', default_created_at)),
+        json.dumps(fields['api_response'], default=str),
+    )
+
+
+def map_chunk(chunk, source=None, keep_raw=False):
+    """Map a chunk of raw records to insert parameters; top-level so it can run in a process pool
+
+    Returns (rows, skipped). Records without a date get the time the chunk
+    was mapped, as the model default would give them.
+    """
+    now = timezone.now()
+    rows = []
+    for raw in chunk:
+        fields = map_record(raw, source=source, keep_raw=keep_raw)
+        if fields is not None:
+            rows.append(insert_values(fields, now))
+    return rows, len(chunk) - len(rows)
+
+
+def iter_chunks(records, size):
+    """Group an iterable into lists of at most ``size`` items"""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_bounded(executor, fn, work, window):
+    """Run ``fn(*args)`` on ``executor`` for each args tuple in ``work``; yield (args, result) in order
+
+    At most ``window`` calls are in flight, so memory stays flat however
+    long ``work`` is, and the caller commits results in input order while
+    the workers run ahead.
+    """
+    pending = deque()
+    for args in work:
+        pending.append((args, executor.submit(fn, *args)))
+        if len(pending) >= window:
+            args, future = pending.popleft()
+            yield args, future.result()
+    while pending:
+        args, future = pending.popleft()
+        yield args, future.result()
+
+
+class Checkpoint:
+    """Progress marker persisted next to a long-running job so it can resume"""
+
+    def __init__(self, path, source):
+        self.path = path
+        self.source = os.path.abspath(source) if source else None
+        self.position = 0
+        # Set by jobs whose output must be recognisable after a resume
+        self.run_id = None
+
+    def load(self):
+        """Load the saved position, ignoring checkpoints for other inputs"""
+        if not self.path or not os.path.exists(self.path):
+            return self.position
+        with open(self.path, 'r', encoding='utf-8') as handle:
+            state = json.load(handle)
+        if state.get('source') == self.source:
+            self.position = int(state.get('position', 0))
+            self.run_id = state.get('run_id')
+        else:
+            logger.warning("Ignoring checkpoint %s: it belongs to %s", self.path, state.get('source'))
+        return self.position
+
+    def save(self, position):
+        """Atomically record that everything before ``position`` is done"""
+        self.position = position
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump({
+                'source': self.source,
+                'position': position,
+                'run_id': self.run_id,
+                'updated_at': datetime.now().isoformat(),
+            }, handle)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def file_fingerprint(path):
+    """Identify a file's contents by its size and a hash of its first megabyte"""
+    digest = hashlib.sha256(str(os.path.getsize(path)).encode())
+    with open(path, 'rb') as handle:
+        digest.update(handle.read(FINGERPRINT_BYTES))
+    return digest.hexdigest()
+
+
+class DatabaseCheckpoint:
+    """Import progress kept in ImportCheckpoint, saved in the transaction that inserts each batch
+
+    Rows and position commit together, so a crash can't leave a batch
+    inserted but unrecorded. A finished import stays recorded, which makes
+    importing the same file again a no-op unless ``restart`` is set.
+    """
+
+    def __init__(self, key, path, restart=False):
+        self.key = key
+        self.fingerprint = file_fingerprint(path)
+        self.restart = restart
+        self.position = 0
+        self.completed = False
+
+    def load(self):
+        """Load the saved position, ignoring progress recorded for a different file"""
+        state = ImportCheckpoint.objects.filter(key=self.key).first()
+        if state is None or self.restart:
+            return self.position
+        if state.fingerprint != self.fingerprint:
+            logger.warning("Ignoring import checkpoint %s: it was recorded for a different file", self.key)
+            return self.position
+        self.position = state.position
+        self.completed = state.completed_at is not None
+        return self.position
+
+    def save(self, position, completed=False):
+        """Record that everything before ``position`` is imported; call inside the insert transaction"""
+        self.position = position
+        self.completed = completed
+        now = timezone.now()
+        ImportCheckpoint.objects.update_or_create(key=self.key, defaults={
+            'fingerprint': self.fingerprint,
+            'position': position,
+            'completed_at': now if completed else None,
+            'updated_at': now,
+        })
+
+    def complete(self):
+        self.save(self.position, completed=True)
+
+
+def report_insert_sql(columns):
+    """INSERT statement for CruxReport rows given as parameter tuples in ``columns`` order"""
+    table = connection.ops.quote_name(CruxReport._meta.db_table)
+    quoted = ', '.join(connection.ops.quote_name(column) for column in columns)
+    return f"INSERT INTO {table} ({quoted}) VALUES ({', '.join(['%s'] * len(columns))})"
+
+
+def bulk_insert_reports(rows, batch_size=5000, checkpoint=None, position=None):
+    """Insert map_chunk rows in one transaction, advancing ``checkpoint`` to ``position`` in it
+
+    Rows skip model instantiation and go straight to executemany, which is
+    several times faster than bulk_create at this volume.
+    """
+    sql = report_insert_sql(IMPORT_COLUMNS)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                cursor.executemany(sql, rows[start:start + batch_size])
+        if checkpoint is not None:
+            checkpoint.save(position)
+    return len(rows)
+
+
+def import_export_file(path, fmt=None, batch_size=5000, workers=0, checkpoint_key=None, restart=False,
+                       keep_raw=False, progress=None):
+    """Stream an export file into CruxReport with batched, resumable inserts
+
+    Each batch and the import's position under ``checkpoint_key`` commit in
+    one transaction, so an interrupted import resumes after the last
+    committed batch, and a file that was imported completely is skipped.
+    With ``workers`` > 0 record decoding and mapping run in a process pool
+    while the main process keeps inserting.
+    """
+    fmt = fmt or detect_format(path)
+    source = os.path.basename(path)
+    checkpoint = DatabaseCheckpoint(checkpoint_key, path, restart=restart) if checkpoint_key else None
+    start_position = checkpoint.load() if checkpoint else 0
+
+    stats = {'read': 0, 'inserted': 0, 'skipped': 0, 'resumed_from': start_position,
+             'already_imported': bool(checkpoint and checkpoint.completed)}
+    if stats['already_imported']:
+        logger.info("%s was already imported completely (%s records); skipping", path, start_position)
+        return stats
+
+    records = iter_raw_records(path, fmt, batch_size=batch_size)
+    position = 0
+    if start_position:
+        logger.info("Resuming import of %s after %s records", path, start_position)
+        for position, _ in enumerate(records, start=1):
+            if position >= start_position:
+                break
+
+    chunks = iter_chunks(records, batch_size)
+
+    def commit(mapped, skipped, chunk_len):
+        nonlocal position
+        position += chunk_len
+        stats['inserted'] += bulk_insert_reports(mapped, batch_size=batch_size, checkpoint=checkpoint,
+                                                 position=position)
+        stats['skipped'] += skipped
+        stats['read'] += chunk_len
+        if progress:
+            progress(stats)
+
+    if workers and workers > 0:
+        with process_pool(workers) as executor:
+            work = ((chunk, source, keep_raw) for chunk in chunks)
+            for (chunk, _, _), (mapped, skipped) in iter_bounded(executor, map_chunk, work, workers * 2):
+                commit(mapped, skipped, len(chunk))
+    else:
+        for chunk in chunks:
+            commit(*map_chunk(chunk, source, keep_raw), len(chunk))
+
+    if checkpoint:
+        checkpoint.complete()
+    return stats
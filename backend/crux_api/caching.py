@@ -0,0 +1,38 @@
+"""HTTP validators and Cache-Control headers for GET-able analysis resources"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .instrumentation import CACHE_HITS
+
+
+def resource_etag(request, *parts):
+    """Strong ETag over the resource version and the negotiated representation"""
+    renderer = getattr(request, 'accepted_renderer', None)
+    version = '|'.join(str(part) for part in (*parts, renderer.format if renderer else ''))
+    return quote_etag(hashlib.blake2b(version.encode(), digest_size=12).hexdigest())
+
+
+def set_validators(response, etag, last_modified, max_age):
+    """Attach ETag, Last-Modified and a public Cache-Control to the response"""
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, public=True, max_age=max_age)
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+def not_modified(request, etag, last_modified, max_age):
+    """A 304 response when the client's If-None-Match/If-Modified-Since still match, else None"""
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified is not None else None,
+    )
+    if response is None:
+        return None
+    if response.status_code == 304:
+        CACHE_HITS.inc(cache='http')
+    return set_validators(response, etag, last_modified, max_age)
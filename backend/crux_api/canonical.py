@@ -0,0 +1,52 @@
+"""Canonical URL normalization and fixed-width URL keys"""
+import hashlib
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+URL_KEY_LENGTH = 32
+
+
+def canonicalize_url(url):
+    """Return the canonical form CrUX uses to identify a page, or None
+
+    Scheme and host are lowercased, default ports, credentials, query
+    strings, fragments and trailing slashes are dropped. CrUX ignores query
+    strings and fragments, so they never identify a distinct page.
+    """
+    if not isinstance(url, str):
+        return None
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return None
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS:
+        return None
+    host = (parts.hostname or '').lower()
+    if not host:
+        return None
+    if ':' in host:
+        host = f"[{host}]"
+    if port and port != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{port}"
+    return urlunsplit((scheme, host, parts.path.rstrip('/'), '', ''))
+
+
+def hash_canonical_url(canonical_url):
+    """Fixed-width hex key for an already canonical URL"""
+    return hashlib.blake2b(canonical_url.encode('utf-8'), digest_size=URL_KEY_LENGTH // 2).hexdigest()
+
+
+def url_key(url):
+    """Fixed-width key shared by every spelling of the same page"""
+    return hash_canonical_url(canonicalize_url(url) or url)
+
+
+def canonical_fields(url):
+    """CruxReport field values derived from a raw URL"""
+    canonical_url = canonicalize_url(url) or url
+    return {
+        'canonical_url': canonical_url,
+        'url_key': hash_canonical_url(canonical_url),
+    }
@@ -0,0 +1,15 @@
+"""Response compression negotiated through Accept-Encoding"""
+from django.middleware.gzip import GZipMiddleware
+
+# Bodies that are already compressed gain nothing from another gzip pass
+ALREADY_COMPRESSED_TYPES = ('application/gzip', 'application/vnd.apache.parquet')
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """GZipMiddleware that leaves already-compressed downloads alone"""
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if content_type in ALREADY_COMPRESSED_TYPES:
+            return response
+        return super().process_response(request, response)
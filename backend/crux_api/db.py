@@ -0,0 +1,45 @@
+"""Per-connection database tuning, applied whenever Django opens a connection"""
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Pragmas CRUX_SQLITE_PRAGMAS may set, with the values each accepts (None: a non-negative integer)
+SQLITE_PRAGMA_VALUES = {
+    'busy_timeout': None,
+    'journal_mode': ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'),
+    'synchronous': ('OFF', 'NORMAL', 'FULL', 'EXTRA'),
+}
+
+
+def sqlite_pragma_statements(pragmas):
+    """PRAGMA statements for validated settings; values come from the environment, so never interpolate them raw"""
+    statements = []
+    for name, value in pragmas.items():
+        if name not in SQLITE_PRAGMA_VALUES:
+            raise ImproperlyConfigured(
+                f"Unsupported SQLite pragma {name!r} in CRUX_SQLITE_PRAGMAS "
+                f"(supported: {', '.join(SQLITE_PRAGMA_VALUES)})"
+            )
+        allowed = SQLITE_PRAGMA_VALUES[name]
+        if allowed is None:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                value = -1
+            if value < 0:
+                raise ImproperlyConfigured(f"SQLite pragma {name} must be a non-negative integer")
+        else:
+            value = str(value).upper()
+            if value not in allowed:
+                raise ImproperlyConfigured(f"SQLite pragma {name} must be one of {', '.join(allowed)}")
+        statements.append(f'PRAGMA {name} = {value}')
+    return statements
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Apply CRUX_SQLITE_PRAGMAS (busy timeout, WAL journaling, synchronous level) to new SQLite connections"""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'CRUX_SQLITE_PRAGMAS', None) or {}
+    with connection.cursor() as cursor:
+        for statement in sqlite_pragma_statements(pragmas):
+            cursor.execute(statement)
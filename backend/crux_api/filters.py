@@ -0,0 +1,48 @@
+"""Query filters shared by the history and export endpoints"""
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .canonical import url_key
+
+FORM_FACTORS = ('ALL_FORM_FACTORS', 'PHONE', 'DESKTOP', 'TABLET')
+
+
+def _parse_bound(value, end_of_day=False):
+    """Parse an ISO date or datetime query parameter into an aware datetime"""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date: {value}")
+        parsed = datetime.combine(day, time.max if end_of_day else time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def filter_reports(queryset, params):
+    """Apply the url, form_factor, since and until filters from query params
+
+    Raises ValueError when a parameter is present but invalid.
+    """
+    url = params.get('url')
+    if url:
+        queryset = queryset.filter(url_key=url_key(url))
+
+    form_factor = params.get('form_factor')
+    if form_factor:
+        if form_factor not in FORM_FACTORS:
+            raise ValueError(f"Invalid form_factor: {form_factor}")
+        queryset = queryset.filter(form_factor=form_factor)
+
+    since = params.get('since')
+    if since:
+        queryset = queryset.filter(created_at__gte=_parse_bound(since))
+
+    until = params.get('until')
+    if until:
+        queryset = queryset.filter(created_at__lte=_parse_bound(until, end_of_day=True))
+
+    return queryset
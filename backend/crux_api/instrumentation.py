@@ -0,0 +1,261 @@
+"""In-process counters and histograms exposed in Prometheus text format
+
+Metrics live in the memory of each worker process; scrape every worker (or
+run a single process) to get complete numbers.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Seconds; tuned for upstream calls and request handling
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Seconds; in-process work such as parsing and summary computation
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def expose(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._sample_lines(items))
+        return lines
+
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def total(self):
+        """Sum over every label combination"""
+        with self._lock:
+            return sum(self._values.values())
+
+    def _sample_lines(self, items):
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    type_name = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels))
+
+    def _sample_lines(self, items):
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the block; labels may be updated inside it"""
+        started = time.perf_counter()
+        try:
+            yield labels
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _sample_lines(self, items):
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def expose(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        for metric in self._metrics.values():
+            metric.clear()
+
+
+REGISTRY = Registry()
+
+UPSTREAM_LATENCY = REGISTRY.register(Histogram(
+    'crux_upstream_request_seconds',
+    'Latency of CrUX API calls by query shape (url or origin) and HTTP status',
+    ('query_shape', 'status'),
+))
+PROCESS_METRICS_TIME = REGISTRY.register(Histogram(
+    'crux_process_metrics_seconds',
+    'Time spent turning a CrUX API response into a result',
+    buckets=FAST_BUCKETS,
+))
+DB_WRITE_TIME = REGISTRY.register(Histogram(
+    'crux_db_write_seconds',
+    'Time spent writing analysis rows to the database',
+    ('model',),
+    buckets=FAST_BUCKETS,
+))
+SUMMARY_TIME = REGISTRY.register(Histogram(
+    'crux_summary_seconds',
+    'Time spent computing multi-URL summary statistics',
+    buckets=FAST_BUCKETS,
+))
+REQUEST_TIME = REGISTRY.register(Histogram(
+    'crux_http_request_seconds',
+    'Total time to handle an API request by view, method and status',
+    ('view', 'method', 'status'),
+))
+ANALYSIS_OUTCOMES = REGISTRY.register(Counter(
+    'crux_analysis_outcomes_total',
+    'Per-URL analysis outcomes (ok, no_data, forbidden, rate_limited, upstream_error, circuit_open, no_api_key, error)',
+    ('outcome',),
+))
+FALLBACKS = REGISTRY.register(Counter(
+    'crux_fallbacks_total',
+    'Results produced by a fallback path (origin query, no-data placeholder, mock data, stale cache)',
+    ('reason',),
+))
+CACHE_HITS = REGISTRY.register(Counter(
+    'crux_cache_hits_total',
+    'Responses served from a cache instead of recomputing them',
+    ('cache',),
+))
+UPSTREAM_RETRIES = REGISTRY.register(Counter(
+    'crux_upstream_retries_total',
+    'CrUX API attempts retried, by the status or network error that caused the retry',
+    ('reason',),
+))
+UPSTREAM_HEDGES = REGISTRY.register(Counter(
+    'crux_upstream_hedges_total',
+    'Hedged CrUX API requests sent after the first passed the observed p95, and how many won',
+    ('result',),
+))
+CIRCUIT_TRANSITIONS = REGISTRY.register(Counter(
+    'crux_circuit_transitions_total',
+    'CrUX API circuit breaker state changes, by the state entered',
+    ('state',),
+))
+API_KEY_REQUESTS = REGISTRY.register(Counter(
+    'crux_api_key_requests_total',
+    'CrUX API calls per key (labelled by fingerprint) and HTTP status',
+    ('key', 'status'),
+))
+API_KEY_QUARANTINES = REGISTRY.register(Counter(
+    'crux_api_key_quarantines_total',
+    'Times a CrUX API key was taken out of rotation, by key fingerprint and reason',
+    ('key', 'reason'),
+))
+
+LOG_RECORDS_DROPPED = REGISTRY.register(Counter(
+    'crux_log_records_dropped_total',
+    'Log records not written, by logger and reason (sampled or queue_full)',
+    ('logger', 'reason'),
+))
+
+STARTUP_SECONDS = REGISTRY.register(Gauge(
+    'crux_startup_seconds',
+    'Worker startup time by phase (django_setup, warmup_*, first_request, time_to_first_request)',
+    ('phase',),
+))
+
+OUTCOMES_BY_STATUS = {400: 'no_data', 404: 'no_data', 403: 'forbidden', 429: 'rate_limited'}
+
+
+class MetricsMiddleware:
+    """Record total request time for every routed request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        REQUEST_TIME.observe(
+            time.perf_counter() - started,
+            view=match.url_name if match and match.url_name else 'unmatched',
+            method=request.method,
+            status=response.status_code,
+        )
+        return response
@@ -0,0 +1,158 @@
+"""Pool of CrUX API keys with per-key quota accounting and quarantine"""
+import hashlib
+import logging
+import threading
+import time
+from collections import deque
+
+import requests
+from django.conf import settings
+
+from .instrumentation import API_KEY_QUARANTINES, API_KEY_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+class NoApiKeyAvailable(requests.exceptions.RequestException):
+    """Every key is quarantined or out of quota for longer than the caller will wait"""
+
+
+def key_fingerprint(key):
+    """Stable, non-reversible label for a key in logs, metrics and the health check"""
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=4).hexdigest()
+
+
+def configured_api_keys():
+    """CRUX_API_KEYS, falling back to the single CRUX_API_KEY"""
+    keys = list(getattr(settings, 'CRUX_API_KEYS', None) or [])
+    if not keys and settings.CRUX_API_KEY:
+        keys = [settings.CRUX_API_KEY]
+    return keys
+
+
+class ApiKey:
+    """One key and its usage: completed call times inside the quota window, in-flight calls, quarantine"""
+
+    def __init__(self, key):
+        self.key = key
+        self.fingerprint = key_fingerprint(key)
+        self.calls = deque()
+        self.in_flight = 0
+        self.quarantined_until = 0.0
+
+
+class KeyPool:
+    """Hands out the least-loaded key that still has quota
+
+    Each key may make ``quota`` calls per sliding ``window`` seconds. Calls
+    are timestamped when they complete and in-flight calls count against the
+    quota, so the pool never runs ahead of the upstream's own accounting. Keys
+    answered with 403 or 429 are quarantined; acquire() waits up to
+    ``max_wait`` seconds for a key to free up before giving up.
+    """
+
+    def __init__(self, keys, quota=150, window=60.0, max_wait=5.0,
+                 forbidden_quarantine=600.0, rate_limit_quarantine=60.0, clock=time.monotonic):
+        self.keys = [ApiKey(key) for key in dict.fromkeys(keys)]
+        self.quota = quota
+        self.window = window
+        self.max_wait = max_wait
+        self.forbidden_quarantine = forbidden_quarantine
+        self.rate_limit_quarantine = rate_limit_quarantine
+        self._clock = clock
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _ready_at(self, key, now):
+        while key.calls and key.calls[0] <= now - self.window:
+            key.calls.popleft()
+        ready = max(now, key.quarantined_until)
+        if len(key.calls) + key.in_flight >= self.quota:
+            # Saturated by in-flight calls alone: usable again only after a release
+            ready = max(ready, key.calls[0] + self.window if key.calls else float('inf'))
+        return ready
+
+    def available(self):
+        """Whether some key could be used right now"""
+        with self._cond:
+            now = self._clock()
+            return any(self._ready_at(key, now) <= now for key in self.keys)
+
+    def acquire(self, max_wait=None):
+        """Reserve a call on the least-loaded usable key; pair every call with release()"""
+        deadline = self._clock() + (self.max_wait if max_wait is None else max_wait)
+        with self._cond:
+            while True:
+                now = self._clock()
+                ready_at = {key: self._ready_at(key, now) for key in self.keys}
+                ready = [key for key, when in ready_at.items() if when <= now]
+                if ready:
+                    key = min(ready, key=lambda candidate: (candidate.in_flight, len(candidate.calls)))
+                    key.in_flight += 1
+                    return key
+                next_ready = min(ready_at.values(), default=float('inf'))
+                in_flight = any(key.in_flight for key in self.keys)
+                if now >= deadline or (next_ready > deadline and not in_flight):
+                    raise NoApiKeyAvailable(
+                        f"All {len(self.keys)} CrUX API key(s) are quarantined or out of quota"
+                    )
+                # Woken early by release() when an in-flight call finishes
+                self._cond.wait(min(next_ready, deadline) - now)
+
+    def release(self, key, status_code=None, retry_after=None):
+        """Finish a call; 403 and 429 responses quarantine the key"""
+        with self._cond:
+            key.in_flight -= 1
+            key.calls.append(self._clock())
+            if status_code == 403:
+                self._quarantine(key, self.forbidden_quarantine, 'forbidden')
+            elif status_code == 429:
+                self._quarantine(key, retry_after or self.rate_limit_quarantine, 'rate_limited')
+            self._cond.notify_all()
+        API_KEY_REQUESTS.inc(key=key.fingerprint, status=status_code if status_code is not None else 'error')
+
+    def _quarantine(self, key, seconds, reason):
+        key.quarantined_until = max(key.quarantined_until, self._clock() + seconds)
+        API_KEY_QUARANTINES.inc(key=key.fingerprint, reason=reason)
+        logger.warning("Quarantined CrUX API key %s for %.0fs (%s)", key.fingerprint, seconds, reason)
+
+    def snapshot(self):
+        """Per-key usage for the health check"""
+        with self._cond:
+            now = self._clock()
+            for key in self.keys:
+                self._ready_at(key, now)  # drops calls that left the window
+            return [
+                {
+                    'key': key.fingerprint,
+                    'calls_in_window': len(key.calls),
+                    'quota': self.quota,
+                    'in_flight': key.in_flight,
+                    'quarantined_for_s': round(max(0.0, key.quarantined_until - now), 1),
+                }
+                for key in self.keys
+            ]
+
+
+_pool = None
+_pool_config = None
+_pool_lock = threading.Lock()
+
+
+def get_key_pool():
+    """Process-wide KeyPool, rebuilt when the configured keys or quota change"""
+    global _pool, _pool_config
+    config = (
+        tuple(configured_api_keys()),
+        settings.CRUX_API_KEY_QUOTA,
+        settings.CRUX_API_KEY_QUOTA_WINDOW,
+        settings.CRUX_API_KEY_WAIT,
+    )
+    with _pool_lock:
+        if _pool is None or config != _pool_config:
+            keys, quota, window, max_wait = config
+            _pool = KeyPool(keys, quota=quota, window=window, max_wait=max_wait)
+            _pool_config = config
+        return _pool
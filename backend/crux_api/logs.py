@@ -0,0 +1,165 @@
+"""Non-blocking, structured logging: a queue handler, a JSON formatter and per-logger sampling
+
+Configured from settings.LOGGING. Request threads only build the record
+and put it on an in-memory queue; formatting and writing happen on a
+listener thread, so slow terminals, pipes or log shippers never stall a
+request. This module is imported while settings are being configured, so
+it must not import models.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone as dt_timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from .instrumentation import LOG_RECORDS_DROPPED
+
+try:
+    import orjson
+except ImportError:  # optional dependency; fall back to the json module
+    orjson = None
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+# Arguments of these types cannot change after the call, so formatting them can wait
+IMMUTABLE_ARG_TYPES = (str, int, float, bool, type(None))
+
+
+def parse_sample_rates(value):
+    """``'crux_api.analysis=0.1,crux_api.resilience=0.5'`` -> {logger prefix: rate}"""
+    rates = {}
+    for item in value.split(','):
+        if not item.strip():
+            continue
+        name, _, rate = item.partition('=')
+        rate = float(rate)
+        if not 0 <= rate <= 1:
+            raise ValueError(f"Sample rate for {name.strip()} must be between 0 and 1")
+        rates[name.strip()] = rate
+    return rates
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line with timestamp, level, logger, message and any ``extra`` fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, dt_timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in RESERVED_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack_info'] = self.formatStack(record.stack_info)
+        if orjson is not None:
+            return orjson.dumps(entry, default=str).decode('utf-8')
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of low-severity records from chatty loggers
+
+    ``rates`` maps logger name prefixes to the fraction of records kept (or
+    is a string for parse_sample_rates); the longest matching prefix wins.
+    Records at ``always_level`` or above are never sampled away.
+    """
+
+    def __init__(self, rates=None, always_level='WARNING'):
+        super().__init__()
+        self.rates = parse_sample_rates(rates) if isinstance(rates, str) else dict(rates or {})
+        self.always_level = logging._checkLevel(always_level)
+        self._cache = {}
+
+    def rate_for(self, name):
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = 1.0
+            matched = ''
+            for prefix, value in self.rates.items():
+                if (name == prefix or name.startswith(prefix + '.')) and len(prefix) >= len(matched):
+                    rate, matched = value, prefix
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno >= self.always_level:
+            return True
+        rate = self.rate_for(record.name)
+        if rate >= 1 or random.random() < rate:
+            return True
+        LOG_RECORDS_DROPPED.inc(logger=record.name, reason='sampled')
+        return False
+
+
+class AsyncStreamHandler(QueueHandler):
+    """Queue records for a background thread that formats and writes them to ``stream``
+
+    The queue is bounded; when it is full new records are dropped and
+    counted rather than blocking the caller. The formatter set on this
+    handler is applied by the listener thread.
+    """
+
+    def __init__(self, stream=None, queue_size=10000):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.closed = False
+        self.target = logging.StreamHandler(stream or sys.stderr)
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=False)
+        self.listener.start()
+        self.listening = True
+        atexit.register(self.close)
+        if hasattr(os, 'register_at_fork'):
+            # Threads do not survive fork (gunicorn --preload); restart in each child
+            os.register_at_fork(after_in_child=self._restart_listener)
+
+    def _restart_listener(self):
+        if self.closed:
+            return
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=False)
+        self.listener.start()
+        self.listening = True
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Unlike QueueHandler.prepare, leave formatting to the listener thread.
+        # Mutable args could change once the call returns, so only those are
+        # merged into the message here; the queue is in-process, so exc_info
+        # can stay as it is.
+        args = record.args
+        if args and not (isinstance(args, tuple) and all(isinstance(arg, IMMUTABLE_ARG_TYPES) for arg in args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(logger=record.name, reason='queue_full')
+
+    def flush(self):
+        """Wait until every queued record has been written"""
+        if self.listening:
+            self.queue.join()
+        self.target.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.listening:
+            self.listening = False
+            self.listener.stop()
+        self.target.flush()
+        super().close()
@@ -0,0 +1,98 @@
+import os
+import statistics
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crux_api.batch import MODES, iter_url_lines, run_batch
+from crux_api.bulk_import import Checkpoint
+from crux_api.filters import FORM_FACTORS
+from crux_api.keypool import configured_api_keys
+
+
+def _percentile_ms(values, q):
+    if len(values) < 2:
+        return values[0] * 1000 if values else 0.0
+    return statistics.quantiles(values, n=100)[q - 1] * 1000
+
+
+class Command(BaseCommand):
+    help = "Analyze a list of URLs (file or stdin) in parallel, with resumable progress"
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="File with one URL per line, or '-' for stdin")
+        parser.add_argument('--form-factor', default='ALL_FORM_FACTORS', choices=FORM_FACTORS)
+        parser.add_argument('--workers', type=int, default=8, help="Parallel workers (default: 8; 1 runs inline)")
+        parser.add_argument('--mode', choices=MODES, default='thread',
+                            help="Run workers as threads (default) or processes")
+        parser.add_argument('--chunk-size', type=int, default=50,
+                            help="URLs per work unit and per AnalysisSession (default: 50)")
+        parser.add_argument('--output', help="Also write results as JSON lines to this file ('-' for stdout)")
+        parser.add_argument('--no-db', action='store_true', help="Don't store reports and sessions in the database")
+        parser.add_argument('--checkpoint',
+                            help="Checkpoint file used to resume (default: <input>.checkpoint; none for stdin)")
+        parser.add_argument('--no-checkpoint', action='store_true', help="Disable checkpointing")
+        parser.add_argument('--key-wait', type=float, default=120.0,
+                            help="Seconds to wait for API key quota before failing a URL (default: 120)")
+
+    def handle(self, *args, **options):
+        source = options['input']
+        if source != '-' and not os.path.exists(source):
+            raise CommandError(f"File not found: {source}")
+        if options['no_db'] and not options['output']:
+            raise CommandError("Nothing to write: pass --output or drop --no-db")
+        if options['workers'] < 1 or options['chunk_size'] < 1:
+            raise CommandError("--workers and --chunk-size must be positive")
+        if not configured_api_keys():
+            raise CommandError("analyze_batch requires CRUX_API_KEY or CRUX_API_KEYS to be configured")
+
+        checkpoint = None
+        if not options['no_checkpoint']:
+            path = options['checkpoint'] or (f"{source}.checkpoint" if source != '-' else None)
+            if path:
+                checkpoint = Checkpoint(path, source if source != '-' else None)
+
+        resuming = checkpoint is not None and checkpoint.load() > 0
+        output = None
+        if options['output'] == '-':
+            output = self.stdout
+        elif options['output']:
+            # Results of chunks committed before an interruption are already in the file
+            output = open(options['output'], 'a' if resuming else 'w', encoding='utf-8')
+
+        started = time.perf_counter()
+
+        def progress(stats):
+            elapsed = time.perf_counter() - started
+            self.stderr.write(f"  {stats['urls']} URLs done ({stats['urls'] / elapsed:,.1f} URLs/s)")
+
+        stream = sys.stdin if source == '-' else open(source, 'r', encoding='utf-8')
+        try:
+            stats = run_batch(
+                iter_url_lines(stream),
+                form_factor=options['form_factor'],
+                workers=options['workers'],
+                mode=options['mode'],
+                chunk_size=options['chunk_size'],
+                persist=not options['no_db'],
+                output=output,
+                checkpoint=checkpoint,
+                progress=progress if options['verbosity'] > 1 else None,
+                key_wait=options['key_wait'],
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if output is not None and output is not self.stdout:
+                output.close()
+
+        elapsed = time.perf_counter() - started
+        latencies = stats['latencies']
+        if stats['resumed_from']:
+            self.stderr.write(f"Resumed after {stats['resumed_from']} previously analyzed URLs")
+        self.stderr.write(self.style.SUCCESS(
+            f"Analyzed {stats['urls']} URLs in {elapsed:.1f}s ({stats['urls'] / elapsed if elapsed else 0:,.1f} URLs/s): "
+            f"{stats['ok']} ok, {stats['stale']} stale, {stats['no_data']} no data, {stats['failed']} failed; "
+            f"per-URL p50 {_percentile_ms(latencies, 50):.0f}ms, p95 {_percentile_ms(latencies, 95):.0f}ms"
+        ))
@@ -0,0 +1,49 @@
+import json
+from importlib import import_module
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crux_api.benchmarks import SUITES
+from crux_api.benchmarks.common import build_report, compare_reports, write_report
+
+
+class Command(BaseCommand):
+    help = "Run a benchmark suite and write machine-readable results"
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='suite', required=True)
+        for name, module_path in SUITES.items():
+            module = import_module(module_path)
+            subparser = subparsers.add_parser(name, help=(module.__doc__ or '').strip())
+            subparser.add_argument('--output', help="Write the JSON report to this file")
+            subparser.add_argument('--baseline', help="Compare against a previous JSON report")
+            subparser.add_argument('--threshold', type=float, default=10.0,
+                                   help="Regression threshold in percent for --baseline (default: 10)")
+            module.add_arguments(subparser)
+
+    def handle(self, *args, **options):
+        suite = options['suite']
+        module = import_module(SUITES[suite])
+        config, cases = module.run(options, log=lambda message: self.stderr.write(message))
+        report = build_report(suite, config, cases)
+
+        for case in cases:
+            metrics = ', '.join(f"{name}={value}" for name, value in case['metrics'].items())
+            self.stdout.write(f"{case['name']:<40} {metrics}")
+
+        if options['output']:
+            write_report(report, options['output'])
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+
+        if options['baseline']:
+            with open(options['baseline'], 'r', encoding='utf-8') as handle:
+                baseline = json.load(handle)
+            regressions = compare_reports(report, baseline, options['threshold'])
+            for regression in regressions:
+                self.stdout.write(self.style.WARNING(
+                    f"REGRESSION {regression['case']} {regression['metric']}: "
+                    f"{regression['baseline']} -> {regression['current']} ({regression['change_pct']:+}%)"
+                ))
+            if regressions:
+                raise CommandError(f"{len(regressions)} metric(s) regressed more than {options['threshold']}%")
+            self.stdout.write(self.style.SUCCESS("No regressions against baseline"))
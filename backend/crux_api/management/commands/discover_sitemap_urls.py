@@ -0,0 +1,85 @@
+import sys
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crux_api.bulk_import import iter_chunks
+from crux_api.keypool import configured_api_keys
+from crux_api.models import AnalysisSession
+from crux_api.sitemaps import SitemapDiscovery
+from crux_api.analysis import CruxAPIClient, analyze_url
+
+
+class Command(BaseCommand):
+    help = "Discover URLs from sitemaps and sitemap indexes, optionally analyzing them"
+
+    def add_arguments(self, parser):
+        parser.add_argument('sitemaps', nargs='+', help="Sitemap files or http(s) URLs")
+        parser.add_argument('--output', help="Write discovered URLs to this file ('-' for stdout)")
+        parser.add_argument('--include', action='append', help="Only keep paths matching this regex (repeatable)")
+        parser.add_argument('--exclude', action='append', help="Drop paths matching this regex (repeatable)")
+        parser.add_argument('--per-pattern', type=int,
+                            help="Keep at most N URLs per path pattern (first path segments, digits masked)")
+        parser.add_argument('--pattern-depth', type=int, default=1,
+                            help="Number of path segments forming a pattern (default: 1)")
+        parser.add_argument('--sample-rate', type=float,
+                            help="Keep a stable hash-based fraction of URLs (0-1)")
+        parser.add_argument('--limit', type=int, help="Stop after this many URLs")
+        parser.add_argument('--analyze', action='store_true', help="Analyze discovered URLs with the CrUX API")
+        parser.add_argument('--form-factor', default='ALL_FORM_FACTORS',
+                            choices=['ALL_FORM_FACTORS', 'PHONE', 'DESKTOP', 'TABLET'])
+        parser.add_argument('--session-size', type=int, default=100,
+                            help="URLs grouped into each AnalysisSession when analyzing (default: 100)")
+
+    def handle(self, *args, **options):
+        if options['sample_rate'] is not None and not 0 < options['sample_rate'] <= 1:
+            raise CommandError("--sample-rate must be between 0 and 1")
+        if options['analyze'] and not configured_api_keys():
+            raise CommandError("--analyze requires CRUX_API_KEY or CRUX_API_KEYS to be configured")
+        if not options['analyze'] and not options['output']:
+            options['output'] = '-'
+
+        discovery = SitemapDiscovery(
+            include=options['include'],
+            exclude=options['exclude'],
+            per_pattern=options['per_pattern'],
+            pattern_depth=options['pattern_depth'],
+            sample_rate=options['sample_rate'],
+            limit=options['limit'],
+        )
+        urls = discovery.discover(options['sitemaps'])
+
+        output = None
+        if options['output']:
+            output = sys.stdout if options['output'] == '-' else open(options['output'], 'w', encoding='utf-8')
+
+        started = time.perf_counter()
+        analyzed = 0
+        try:
+            client = CruxAPIClient() if options['analyze'] else None
+            for chunk in iter_chunks(urls, options['session_size']):
+                if output:
+                    output.write('\n'.join(chunk) + '\n')
+                if client:
+                    session = AnalysisSession.objects.create(session_id=str(uuid.uuid4()), urls=chunk)
+                    for url in chunk:
+                        analyze_url(client, url, options['form_factor'], session=session)
+                    analyzed += len(chunk)
+                    self.stderr.write(f"  analyzed {analyzed} URLs")
+        finally:
+            discovery.close()
+            if output and output is not sys.stdout:
+                output.close()
+
+        stats = discovery.stats
+        elapsed = time.perf_counter() - started
+        self.stderr.write(self.style.SUCCESS(
+            f"Read {stats['sitemaps']} sitemaps and {stats['entries']} entries: {stats['emitted']} URLs kept, "
+            f"{stats['duplicates']} duplicates, {stats['filtered']} filtered ({elapsed:.1f}s)"
+        ))
+        if stats['failed']:
+            raise CommandError(
+                f"{stats['failed']} of {stats['sitemaps']} sitemaps could not be read or parsed; "
+                "the URL list is incomplete"
+            )
@@ -0,0 +1,65 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crux_api.bulk_export import DATASETS, EXPORT_FORMATS, stream_export
+from crux_api.filters import filter_reports
+from crux_api.models import CruxReport
+
+
+class Command(BaseCommand):
+    help = "Stream CrUX report history or monthly rollups to CSV, JSONL or Parquet"
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Output file, or '-' for stdout; a .gz suffix enables gzip")
+        parser.add_argument('--dataset', choices=DATASETS, default='reports')
+        parser.add_argument('--format', choices=EXPORT_FORMATS, help="Output format (default: from file extension)")
+        parser.add_argument('--gzip', action='store_true', help="Compress the output")
+        parser.add_argument('--url', help="Only export reports for this URL")
+        parser.add_argument('--form-factor', help="Only export reports for this form factor")
+        parser.add_argument('--since', help="Only export reports created on or after this date")
+        parser.add_argument('--until', help="Only export reports created on or before this date")
+
+    def handle(self, *args, **options):
+        output = options['output']
+        compress = options['gzip'] or output.endswith('.gz')
+        fmt = options['format'] or self._detect_format(output)
+
+        params = {
+            'url': options['url'],
+            'form_factor': options['form_factor'],
+            'since': options['since'],
+            'until': options['until'],
+        }
+        try:
+            reports = filter_reports(CruxReport.objects.all(), params)
+            chunks = stream_export(reports, dataset=options['dataset'], fmt=fmt, compress=compress)
+        except (ValueError, ImportError) as e:
+            raise CommandError(str(e))
+
+        started = time.perf_counter()
+        written = 0
+        handle = sys.stdout.buffer if output == '-' else open(output, 'wb')
+        try:
+            for chunk in chunks:
+                handle.write(chunk)
+                written += len(chunk)
+        finally:
+            if handle is not sys.stdout.buffer:
+                handle.close()
+
+        if output != '-':
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f"Exported {options['dataset']} to {output} ({written / 1e6:.1f} MB in {elapsed:.1f}s)"
+            ))
+
+    def _detect_format(self, output):
+        name = output[:-3] if output.endswith('.gz') else output
+        for fmt in EXPORT_FORMATS:
+            if name.endswith(f'.{fmt}'):
+                return fmt
+        if output == '-':
+            return 'csv'
+        raise CommandError(f"Cannot detect export format for {output}; pass --format explicitly")
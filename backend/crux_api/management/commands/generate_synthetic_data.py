@@ -0,0 +1,83 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from crux_api.filters import FORM_FACTORS
+from crux_api.models import AnalysisSession
+from crux_api.synthetic import SESSION_PREFIX, clear_synthetic_data, generate_synthetic_data
+
+
+class Command(BaseCommand):
+    help = "Bulk-load seeded, CrUX-shaped reports and sessions for load testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--urls', type=int, default=10000, help="Distinct URLs to generate (default: 10000)")
+        parser.add_argument('--periods', type=int, default=12, help="Collection periods per URL (default: 12)")
+        parser.add_argument('--interval-days', type=int, default=28,
+                            help="Days between collection periods (default: 28)")
+        parser.add_argument('--end-date', help="Last day of the newest period, YYYY-MM-DD (default: two days ago)")
+        parser.add_argument('--form-factors', default='ALL_FORM_FACTORS',
+                            help="Comma-separated form factors (default: ALL_FORM_FACTORS)")
+        parser.add_argument('--seed', type=int, default=0, help="Seed for generated URLs and records")
+        parser.add_argument('--pages-per-site', type=int, default=200)
+        parser.add_argument('--session-size', type=int, default=100,
+                            help="URLs grouped into each AnalysisSession (default: 100)")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per INSERT (default: 5000)")
+        parser.add_argument('--workers', type=int, default=0,
+                            help="Generate records in a process pool of this size (default: inline)")
+        parser.add_argument('--no-raw', action='store_true',
+                            help="Store only p75 columns, not the full API response (faster, much smaller)")
+        parser.add_argument('--clear', action='store_true',
+                            help="Delete previously generated data for this seed first")
+
+    def handle(self, *args, **options):
+        form_factors = [value.strip() for value in options['form_factors'].split(',') if value.strip()]
+        invalid = [value for value in form_factors if value not in FORM_FACTORS]
+        if invalid or not form_factors:
+            raise CommandError(f"Invalid form factors: {', '.join(invalid) or '(none)'}")
+        for name in ('urls', 'periods', 'interval_days', 'pages_per_site', 'session_size', 'batch_size'):
+            if options[name] < 1:
+                raise CommandError(f"--{name.replace('_', '-')} must be positive")
+        end_date = None
+        if options['end_date']:
+            end_date = parse_date(options['end_date'])
+            if end_date is None:
+                raise CommandError(f"Invalid --end-date: {options['end_date']}")
+
+        seed = options['seed']
+        if options['clear']:
+            reports, sessions = clear_synthetic_data(seed)
+            self.stdout.write(f"Deleted {reports} synthetic reports and {sessions} sessions for seed {seed}")
+        elif AnalysisSession.objects.filter(session_id__startswith=f"{SESSION_PREFIX}-{seed}-").exists():
+            raise CommandError(f"Synthetic data for seed {seed} already exists; pass --clear or another --seed")
+
+        total = options['urls'] * options['periods'] * len(form_factors)
+        started = time.perf_counter()
+
+        def progress(stats):
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"  {stats['reports']:,}/{total:,} reports ({stats['reports'] / elapsed:,.0f} rows/s)"
+            )
+
+        stats = generate_synthetic_data(
+            options['urls'],
+            periods=options['periods'],
+            interval_days=options['interval_days'],
+            form_factors=form_factors,
+            seed=seed,
+            end_date=end_date,
+            block_size=options['session_size'],
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            raw=not options['no_raw'],
+            pages_per_site=options['pages_per_site'],
+            progress=progress if options['verbosity'] > 1 else None,
+        )
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {stats['reports']:,} reports in {stats['sessions']:,} sessions in {elapsed:.1f}s "
+            f"({stats['reports'] / elapsed if elapsed else 0:,.0f} rows/s)"
+        ))
@@ -0,0 +1,72 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crux_api.bulk_import import SUPPORTED_FORMATS, import_export_file
+
+
+class Command(BaseCommand):
+    help = "Stream a CrUX BigQuery export (CSV, JSONL or Parquet) into CruxReport"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Export file to import (.csv, .jsonl, .parquet, optionally .gz)")
+        parser.add_argument('--format', choices=SUPPORTED_FORMATS, help="Override format detection")
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="Rows per insert transaction (default: 5000)")
+        parser.add_argument('--workers', type=int, default=0,
+                            help="Parse records in a process pool of this size (default: parse inline)")
+        parser.add_argument('--checkpoint',
+                            help="Name the import's progress is stored under in the database "
+                                 "(default: the file's absolute path)")
+        parser.add_argument('--no-checkpoint', action='store_true', help="Disable checkpointing")
+        parser.add_argument('--restart', action='store_true',
+                            help="Discard saved progress and import the whole file again")
+        parser.add_argument('--keep-raw', action='store_true',
+                            help="Store each source row in api_response (slower, larger database)")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f"File not found: {path}")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        checkpoint_key = None
+        if not options['no_checkpoint']:
+            checkpoint_key = options['checkpoint'] or os.path.abspath(path)
+
+        started = time.perf_counter()
+
+        def progress(stats):
+            elapsed = time.perf_counter() - started
+            rate = stats['read'] / elapsed if elapsed else 0
+            self.stdout.write(f"  {stats['inserted']} inserted, {stats['skipped']} skipped ({rate:,.0f} rows/s)")
+
+        try:
+            stats = import_export_file(
+                path,
+                fmt=options['format'],
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                checkpoint_key=checkpoint_key,
+                restart=options['restart'],
+                keep_raw=options['keep_raw'],
+                progress=progress if options['verbosity'] > 1 else None,
+            )
+        except (ValueError, ImportError) as e:
+            raise CommandError(str(e))
+
+        if stats['already_imported']:
+            self.stdout.write(self.style.WARNING(
+                f"{path} was already imported ({stats['resumed_from']} records); pass --restart to import it again"
+            ))
+            return
+        elapsed = time.perf_counter() - started
+        rate = stats['read'] / elapsed if elapsed else 0
+        if stats['resumed_from']:
+            self.stdout.write(f"Resumed after {stats['resumed_from']} previously imported records")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['inserted']} reports from {path} "
+            f"({stats['skipped']} skipped) in {elapsed:.1f}s ({rate:,.0f} rows/s)"
+        ))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from crux_api.simulator import CruxSimulator, SimulatorConfig
+
+
+class Command(BaseCommand):
+    help = "Serve seeded, CrUX-shaped responses locally for offline development and benchmarks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--seed', type=int, default=0, help="Seed for generated records")
+        parser.add_argument('--latency-ms', type=float, default=150.0, help="Mean response latency")
+        parser.add_argument('--jitter-ms', type=float, default=50.0, help="Latency standard deviation")
+        parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 503")
+        parser.add_argument('--rate-limit-rate', type=float, default=0.0,
+                            help="Fraction of requests answered with 429")
+        parser.add_argument('--no-data-rate', type=float, default=0.1,
+                            help="Fraction of URLs without page-level data (404)")
+        parser.add_argument('--quota', type=int, default=0,
+                            help="Calls allowed per key per --quota-window seconds before 429s (0: unlimited)")
+        parser.add_argument('--quota-window', type=float, default=60.0)
+
+    def handle(self, *args, **options):
+        config = SimulatorConfig(
+            seed=options['seed'],
+            latency_ms=options['latency_ms'],
+            jitter_ms=options['jitter_ms'],
+            error_rate=options['error_rate'],
+            rate_limit_rate=options['rate_limit_rate'],
+            no_data_rate=options['no_data_rate'],
+            quota=options['quota'],
+            quota_window=options['quota_window'],
+        )
+        server = CruxSimulator((options['host'], options['port']), config)
+        self.stdout.write(self.style.SUCCESS(f"CrUX simulator listening on {server.api_url}"))
+        self.stdout.write(f"Point the backend at it with CRUX_API_URL={server.api_url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,27 @@
+# Generated by Django 5.0 on 2026-10-19 07:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crux_api', '0002_alter_analysissession_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cruxreport',
+            name='canonical_url',
+            field=models.URLField(blank=True, default='', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='cruxreport',
+            name='url_key',
+            field=models.CharField(blank=True, default='', max_length=32),
+        ),
+        migrations.AddIndex(
+            model_name='cruxreport',
+            index=models.Index(fields=['url_key', 'form_factor', '-created_at'], name='crux_report_url_key_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+from crux_api.canonical import canonical_fields
+
+BATCH_SIZE = 2000
+
+
+def populate_url_key(apps, schema_editor):
+    CruxReport = apps.get_model('crux_api', 'CruxReport')
+    last_id = 0
+    while True:
+        # Keyset pagination keeps each batch an indexed range scan
+        batch = list(
+            CruxReport.objects.filter(id__gt=last_id, url_key='')
+            .only('id', 'url')
+            .order_by('id')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for report in batch:
+            for field, value in canonical_fields(report.url).items():
+                setattr(report, field, value)
+        CruxReport.objects.bulk_update(batch, ['canonical_url', 'url_key'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crux_api', '0003_cruxreport_canonical_url'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_url_key, migrations.RunPython.noop),
+    ]
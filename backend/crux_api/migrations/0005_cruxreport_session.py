@@ -0,0 +1,19 @@
+# Generated by Django 5.0 on 2026-10-19 07:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crux_api', '0004_populate_url_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cruxreport',
+            name='session',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reports', to='crux_api.analysissession'),
+        ),
+    ]
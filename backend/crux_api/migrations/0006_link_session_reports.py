@@ -0,0 +1,50 @@
+from django.db import migrations
+
+from crux_api.canonical import url_key
+
+BATCH_SIZE = 500
+
+
+def link_session_reports(apps, schema_editor):
+    """Attach existing reports to sessions the way the session view used to find them
+
+    Each session URL gets the latest not yet linked report stored no later
+    than the session itself; older sessions are linked first.
+    """
+    AnalysisSession = apps.get_model('crux_api', 'AnalysisSession')
+    CruxReport = apps.get_model('crux_api', 'CruxReport')
+    last_id = 0
+    while True:
+        sessions = list(
+            AnalysisSession.objects.filter(id__gt=last_id)
+            .only('id', 'urls', 'created_at')
+            .order_by('id')[:BATCH_SIZE]
+        )
+        if not sessions:
+            break
+        for session in sessions:
+            keys = {url_key(url) for url in session.urls if isinstance(url, str)}
+            if not keys:
+                continue
+            candidates = (
+                CruxReport.objects.filter(url_key__in=keys, created_at__lte=session.created_at, session__isnull=True)
+                .order_by('url_key', '-created_at')
+                .values_list('id', 'url_key')
+            )
+            latest = {}
+            for report_id, key in candidates:
+                latest.setdefault(key, report_id)
+            if latest:
+                CruxReport.objects.filter(id__in=latest.values()).update(session_id=session.id)
+        last_id = sessions[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crux_api', '0005_cruxreport_session'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_session_reports, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,24 @@
 from django.db import models
 from django.utils import timezone
 
+from .canonical import canonical_fields
+
+# Display name and CruxReport column of each stored p75 metric
+STORED_METRICS = (
+    ('Largest Contentful Paint (LCP)', 'largest_contentful_paint'),
+    ('Interaction to Next Paint (INP)', 'interaction_to_next_paint'),
+    ('Cumulative Layout Shift (CLS)', 'cumulative_layout_shift'),
+    ('First Contentful Paint (FCP)', 'first_contentful_paint'),
+    ('First Input Delay (FID)', 'first_input_delay'),
+    ('Time to First Byte (TTFB)', 'time_to_first_byte'),
+)
+
 class CruxReport(models.Model):
     """Model to store CrUX report data"""
     url = models.URLField(max_length=500)
+    # Canonical form of url and its fixed-width hash, used for lookups and grouping
+    canonical_url = models.URLField(max_length=500, blank=True, default='')
+    url_key = models.CharField(max_length=32, blank=True, default='')
     form_factor = models.CharField(max_length=20, default='ALL_FORM_FACTORS')
     
     # Core Web Vitals
@@ -19,12 +34,26 @@ class CruxReport(models.Model):
     # Metadata
     created_at = models.DateTimeField(default=timezone.now)
     api_response = models.JSONField(default=dict, blank=True)
+    # Analysis run that produced the report, if any
+    session = models.ForeignKey(
+        'AnalysisSession', null=True, blank=True, on_delete=models.SET_NULL, related_name='reports',
+    )
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['url_key', 'form_factor', '-created_at'], name='crux_report_url_key_idx'),
+        ]
     
     def __str__(self):
         return f"CrUX Report for {self.url} - {self.form_factor}"
+    
+    def save(self, *args, **kwargs):
+        # bulk_create bypasses save(); bulk loaders set these via canonical_fields()
+        if self.url:
+            for field, value in canonical_fields(self.url).items():
+                setattr(self, field, value)
+        super().save(*args, **kwargs)
 
 class AnalysisSession(models.Model):
     """Model to group multiple URL analyses together"""
@@ -36,4 +65,17 @@ class AnalysisSession(models.Model):
         ordering = ['-created_at']
     
     def __str__(self):
-        return f"Analysis Session {self.session_id}"
\ No newline at end of file
+        return f"Analysis Session {self.session_id}"
+
+
+class ImportCheckpoint(models.Model):
+    """Progress of a bulk import, written in the same transaction as each inserted batch"""
+    key = models.CharField(max_length=500, unique=True)
+    # Size and leading-bytes hash of the file the position refers to
+    fingerprint = models.CharField(max_length=64)
+    position = models.BigIntegerField(default=0)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Import checkpoint {self.key} at {self.position}"
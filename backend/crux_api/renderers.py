@@ -0,0 +1,103 @@
+"""Faster JSON rendering and the opt-in compact columnar response format"""
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # optional dependency; fall back to DRF's json-based renderer
+    orjson = None
+
+COMPACT_MEDIA_TYPE = 'application/vnd.crux.compact+json'
+METRIC_VALUE_FIELDS = ('p75_value', 'good_ratio', 'needs_improvement_ratio', 'poor_ratio')
+RESULT_FIELDS = ('url', 'form_factor', 'overall_performance', 'created_at')
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that serializes with orjson when it is installed"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            # The representation is negotiated on Accept (see CompactJSONRenderer)
+            patch_vary_headers(response, ('Accept',))
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+        encoder = self.encoder_class()
+        ret = orjson.dumps(data, default=encoder.default, option=options)
+        # Match JSONRenderer: keep the output a strict JavaScript subset
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+def rows_to_columns(rows):
+    """Turn a list of flat dicts into {field: [values...]} with one key list"""
+    columns = {}
+    for row in rows:
+        for key in row:
+            if key not in columns:
+                columns[key] = []
+    for key, values in columns.items():
+        values.extend(row.get(key) for row in rows)
+    return columns
+
+
+def results_to_columns(results):
+    """Columnar form of analysis results
+
+    Metric names are listed once; every per-metric value becomes a list
+    (one per metric name) of values aligned with ``url``.
+    """
+    names = []
+    index = {}
+    for result in results:
+        for metric in result.get('metrics') or []:
+            name = metric.get('metric_name')
+            if name not in index:
+                index[name] = len(names)
+                names.append(name)
+
+    columns = {field: [result.get(field) for result in results] for field in RESULT_FIELDS}
+    values = {field: [[None] * len(results) for _ in names] for field in METRIC_VALUE_FIELDS}
+    for row, result in enumerate(results):
+        for metric in result.get('metrics') or []:
+            position = index[metric.get('metric_name')]
+            for field in METRIC_VALUE_FIELDS:
+                values[field][position][row] = metric.get(field)
+    columns['metrics'] = {'names': names, **values}
+    return columns
+
+
+def to_compact(data):
+    """Convert an API payload to the compact columnar format
+
+    Analysis responses (a dict with ``results``) get columnar results and
+    summary; history-style lists of rows become column dicts. Anything else,
+    such as error payloads, is returned unchanged.
+    """
+    if isinstance(data, list) and all(isinstance(row, dict) for row in data):
+        return {'format': 'columnar', 'rows': len(data), 'columns': rows_to_columns(data)}
+    if isinstance(data, dict) and isinstance(data.get('results'), list):
+        compact = {key: value for key, value in data.items() if key not in ('results', 'summary')}
+        compact['format'] = 'columnar'
+        compact['results'] = results_to_columns(data['results'])
+        if isinstance(data.get('summary'), list):
+            compact['summary'] = rows_to_columns(data['summary'])
+        return compact
+    return data
+
+
+class CompactJSONRenderer(FastJSONRenderer):
+    """Columnar JSON, selected with ``Accept: application/vnd.crux.compact+json`` or ``?format=compact``"""
+
+    media_type = COMPACT_MEDIA_TYPE
+    format = 'compact'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(to_compact(data), accepted_media_type, renderer_context)
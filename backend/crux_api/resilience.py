@@ -0,0 +1,347 @@
+"""Resilience for upstream CrUX API calls: timeouts, retries, hedging and a circuit breaker"""
+import contextvars
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.utils.http import parse_http_date_safe
+from requests.adapters import HTTPAdapter
+
+from .keypool import NoApiKeyAvailable
+from .instrumentation import CIRCUIT_TRANSITIONS, UPSTREAM_HEDGES, UPSTREAM_LATENCY, UPSTREAM_RETRIES
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of calling upstream while the circuit breaker is open"""
+
+
+def is_transient(status_code):
+    """Statuses worth retrying: rate limiting and server-side failures"""
+    return status_code == 429 or status_code >= 500
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    timestamp = parse_http_date_safe(value)
+    if timestamp is None:
+        return None
+    return max(0.0, timestamp - time.time())
+
+
+class RetryPolicy:
+    """Jittered exponential backoff bounded by an overall deadline"""
+
+    def __init__(self, attempts=3, base_delay=0.25, max_delay=10.0, deadline=20.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def backoff(self, attempt, retry_after=None):
+        """Seconds to wait after failed attempt number ``attempt``, or None to give up
+
+        Uses "full jitter" so concurrent workers don't retry in lockstep. A
+        Retry-After hint is honored unless it asks for more than max_delay.
+        """
+        if attempt >= self.attempts:
+            return None
+        if retry_after is not None and retry_after > self.max_delay:
+            return None
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        return max(delay, retry_after or 0.0)
+
+
+class LatencyTracker:
+    """Sliding window of recent upstream latencies"""
+
+    def __init__(self, window=500, min_samples=20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q):
+        """Nearest-rank percentile of the window, or None until enough samples exist"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures -> half-open trial after a cool-down"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def allow(self):
+        """Whether a call may go upstream; in half-open state only one trial call is let through"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            self._transition(self.CLOSED)
+
+    def cancel(self):
+        """Give back a half-open trial slot without recording an outcome"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+                self._transition(self.OPEN)
+
+    def _current_state(self):
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._transition(self.HALF_OPEN)
+        return self._state
+
+    def _transition(self, state):
+        if state != self._state:
+            logger.warning("CrUX API circuit breaker %s -> %s", self._state, state)
+            self._state = state
+            CIRCUIT_TRANSITIONS.inc(state=state)
+
+
+class UpstreamClient:
+    """Pooled HTTP session that applies the retry, hedging and circuit-breaker policies"""
+
+    def __init__(self, connect_timeout=3.05, read_timeout=10.0, retry=None, breaker=None,
+                 hedge=False, pool_size=10):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+        self.hedge = hedge
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._hedge_pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='crux-hedge') if hedge else None
+
+    @classmethod
+    def from_settings(cls):
+        return cls(
+            connect_timeout=settings.CRUX_CONNECT_TIMEOUT,
+            read_timeout=settings.CRUX_READ_TIMEOUT,
+            retry=RetryPolicy(
+                attempts=settings.CRUX_RETRY_ATTEMPTS,
+                base_delay=settings.CRUX_RETRY_BASE_DELAY,
+                max_delay=settings.CRUX_RETRY_MAX_DELAY,
+                deadline=settings.CRUX_REQUEST_DEADLINE,
+            ),
+            breaker=CircuitBreaker(
+                failure_threshold=settings.CRUX_CIRCUIT_FAILURE_THRESHOLD,
+                reset_timeout=settings.CRUX_CIRCUIT_RESET_SECONDS,
+            ),
+            hedge=settings.CRUX_HEDGE_ENABLED,
+        )
+
+    def preconnect(self, url):
+        """Open a pooled connection to the host of ``url`` ahead of the first call
+
+        Sends a HEAD to the host root without an API key, so no quota is
+        used; the keep-alive connection it leaves in the pool is reused by
+        the next post(). Returns False when the host could not be reached.
+        """
+        parts = urlsplit(url)
+        try:
+            self.session.head(
+                f'{parts.scheme}://{parts.netloc}/',
+                timeout=(self.connect_timeout, self.read_timeout),
+                allow_redirects=False,
+            )
+        except requests.exceptions.RequestException as e:
+            logger.warning("Could not pre-connect to %s: %s", parts.netloc, e)
+            return False
+        return True
+
+    def post(self, url, payload, query_shape, keys=None, key_wait=None):
+        """POST with retries; returns the final response or raises the final network error
+
+        Transient statuses that outlive the retries are returned, not raised,
+        so callers keep handling HTTP errors the way they already do. With a
+        KeyPool, every attempt takes its API key from the pool, waiting up to
+        ``key_wait`` seconds (default: the pool's max_wait), and a 403 or 429
+        is retried at once on another key when one is available.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError("CrUX API circuit breaker is open; skipping upstream call")
+        try:
+            response, error = self._with_retries(url, payload, query_shape, keys, key_wait)
+        except NoApiKeyAvailable:
+            # Our own quota, not upstream health
+            self.breaker.cancel()
+            raise
+        except requests.exceptions.RequestException:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Not upstream health either (a bug, an interrupt): give back a half-open
+            # trial slot without counting a failure
+            self.breaker.cancel()
+            raise
+
+        if error is not None or is_transient(response.status_code):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        if error is not None:
+            raise error
+        return response
+
+    def _with_retries(self, url, payload, query_shape, keys, key_wait):
+        deadline = time.monotonic() + self.retry.deadline
+        attempt = 1
+        while True:
+            remaining = deadline - time.monotonic()
+            timeout = (self.connect_timeout, max(0.1, min(self.read_timeout, remaining)))
+            error = response = None
+            try:
+                response = self._attempt(url, payload, query_shape, timeout, keys, key_wait)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = e
+            # The failing key is quarantined by now; another key may succeed immediately
+            switch_key = (
+                response is not None and response.status_code in (403, 429)
+                and keys is not None and keys.available()
+            )
+            if error is None and not is_transient(response.status_code) and not switch_key:
+                return response, None
+
+            if switch_key:
+                delay = 0.0 if attempt < self.retry.attempts else None
+            else:
+                retry_after = parse_retry_after(response.headers.get('Retry-After')) if response is not None else None
+                delay = self.retry.backoff(attempt, retry_after)
+            if delay is None or time.monotonic() + delay >= deadline:
+                return response, error
+
+            reason = type(error).__name__ if error is not None else str(response.status_code)
+            UPSTREAM_RETRIES.inc(reason=reason)
+            logger.warning(
+                "Retrying CrUX %s query in %.2fs after %s (attempt %s/%s)",
+                query_shape, delay, reason, attempt + 1, self.retry.attempts,
+            )
+            time.sleep(delay)
+            attempt += 1
+
+    def _send(self, url, payload, query_shape, timeout, keys, key_wait):
+        key = keys.acquire(key_wait) if keys is not None else None
+        try:
+            with span('upstream'), UPSTREAM_LATENCY.time(query_shape=query_shape, status='error') as labels:
+                started = time.perf_counter()
+                response = self.session.post(
+                    url, json=payload, params={'key': key.key} if key else None, timeout=timeout,
+                )
+                labels['status'] = response.status_code
+        except BaseException:
+            if key is not None:
+                keys.release(key)
+            raise
+        if key is not None:
+            keys.release(key, response.status_code, parse_retry_after(response.headers.get('Retry-After')))
+        self.latency.observe(time.perf_counter() - started)
+        return response
+
+    def _attempt(self, url, payload, query_shape, timeout, keys, key_wait):
+        threshold = self.latency.percentile(95) if self.hedge else None
+        if threshold is None:
+            return self._send(url, payload, query_shape, timeout, keys, key_wait)
+
+        # Hedge: if the first request outlives the observed p95, race a second one
+        primary = self._hedge_pool.submit(
+            contextvars.copy_context().run, self._send, url, payload, query_shape, timeout, keys, key_wait,
+        )
+        done, _ = wait([primary], timeout=threshold)
+        if done:
+            return primary.result()
+        UPSTREAM_HEDGES.inc(result='sent')
+        hedge = self._hedge_pool.submit(
+            contextvars.copy_context().run, self._send, url, payload, query_shape, timeout, keys, key_wait,
+        )
+        errors = []
+        for future in as_completed([primary, hedge]):
+            try:
+                response = future.result()
+            except Exception as e:
+                # A failed leg (network or otherwise) just leaves the race to the other one
+                errors.append(e)
+                continue
+            if future is hedge:
+                UPSTREAM_HEDGES.inc(result='won')
+            # Nobody reads the losing leg's response; close it so its connection goes back to the pool
+            (primary if future is hedge else hedge).add_done_callback(_close_response)
+            return response
+        # Both legs failed: prefer a network error, which the retry loop treats as retryable
+        network_errors = [
+            e for e in errors if isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+        ]
+        raise (network_errors or errors)[0]
+
+
+def _close_response(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+_upstream = None
+_upstream_lock = threading.Lock()
+
+
+def get_upstream():
+    """Process-wide UpstreamClient, so pooled connections and breaker state are shared"""
+    global _upstream
+    if _upstream is None:
+        with _upstream_lock:
+            if _upstream is None:
+                _upstream = UpstreamClient.from_settings()
+    return _upstream
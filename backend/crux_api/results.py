@@ -0,0 +1,271 @@
+"""Compact in-memory analysis results, converted to the public JSON shape only at the API edge
+
+A processed result used to be a dict holding one dict per metric, with
+the metric name and four value keys repeated in every row and a
+timestamp string per row. AnalysisResult keeps the same information in
+a slotted object: metric values live in one flat array of doubles indexed
+by Metric, missing values are NaN, and the timestamp is a float until
+to_dict() formats it.
+"""
+import math
+import time
+from array import array
+from datetime import datetime
+from enum import IntEnum
+
+from .models import STORED_METRICS
+
+NAN = float('nan')
+# p75, good, needs improvement and poor ratio for each metric
+VALUES_PER_METRIC = 4
+
+
+class Metric(IntEnum):
+    """CrUX metrics, in the order results list them"""
+    LCP = 0
+    CLS = 1
+    INP = 2
+    FCP = 3
+    FID = 4
+    TTFB = 5
+
+    @property
+    def field(self):
+        """CrUX API metric key, which is also the CruxReport column"""
+        return METRIC_FIELDS[self]
+
+    @property
+    def display_name(self):
+        return METRIC_NAMES[self]
+
+
+METRIC_FIELDS = (
+    'largest_contentful_paint',
+    'cumulative_layout_shift',
+    'interaction_to_next_paint',
+    'first_contentful_paint',
+    'first_input_delay',
+    'time_to_first_byte',
+)
+METRIC_NAMES = tuple({field: name for name, field in STORED_METRICS}[field] for field in METRIC_FIELDS)
+# Core Web Vitals: LCP, CLS, and INP (replaced FID)
+CORE_VITALS = (Metric.LCP, Metric.CLS, Metric.INP)
+_EMPTY_VALUES = array('d', [NAN] * (len(Metric) * VALUES_PER_METRIC))
+# Plain ints and the members themselves, so hot loops avoid iterating the enum
+_METRIC_INDEXES = range(len(Metric))
+_METRICS = tuple(Metric)
+
+
+def overall_rating(good_ratios):
+    """Overall performance from the good ratios of the Core Web Vitals that have one"""
+    good_ratios = [ratio for ratio in good_ratios if ratio is not None]
+    if not good_ratios:
+        return 'Insufficient data'
+    # Good threshold: 75% of users should have good experience
+    ratio = sum(1 for good in good_ratios if good >= 0.75) / len(good_ratios)
+    if ratio >= 0.67:  # At least 2 out of 3 Core Web Vitals are good
+        return 'Good'
+    elif ratio >= 0.33:  # At least 1 out of 3 Core Web Vitals are good
+        return 'Needs Improvement'
+    return 'Poor'
+
+
+def _optional(value):
+    return None if value != value else value  # NaN -> None
+
+
+def _p75_output(metric, value):
+    # Millisecond percentiles come from the API as integers; keep them that way in JSON
+    if value != value:
+        return None
+    if metric is not Metric.CLS and value.is_integer():
+        return int(value)
+    return value
+
+
+class AnalysisResult:
+    """One URL's analysis: identity, per-metric values in a flat array and a few flags"""
+
+    __slots__ = (
+        'url', 'form_factor', 'overall_performance', 'created_at', 'present', 'values',
+        'stale', 'report_id', 'collection_period',
+    )
+
+    def __init__(self, url, form_factor, overall_performance=None, created_at=None):
+        self.url = url
+        self.form_factor = form_factor
+        self.overall_performance = overall_performance
+        # Epoch seconds for fresh results, the stored datetime for reports, or None
+        self.created_at = time.time() if created_at is None else created_at
+        self.present = 0  # bit per Metric that has an entry, even one without values
+        self.values = array('d', _EMPTY_VALUES)
+        self.stale = False
+        self.report_id = None
+        self.collection_period = None
+
+    @classmethod
+    def placeholder(cls, url, form_factor, overall_performance, metrics=()):
+        """Result without data, e.g. for upstream errors; ``metrics`` get entries with no values"""
+        result = cls(url, form_factor, overall_performance)
+        for metric in metrics:
+            result.present |= 1 << metric
+        return result
+
+    @classmethod
+    def from_record(cls, api_response, url, form_factor):
+        """Parse a CrUX queryRecord response
+
+        p75 comes from the percentiles, and the ratios from a histogram
+        whose first bucket is good, last bucket poor and any middle
+        buckets needs-improvement.
+        """
+        record = api_response.get('record')
+        if not record or 'metrics' not in record:
+            return cls.placeholder(url, form_factor, 'No data available')
+        result = cls(url, form_factor)
+        values = result.values
+        raw_metrics = record['metrics']
+        for metric, key in enumerate(METRIC_FIELDS):
+            metric_data = raw_metrics.get(key)
+            if metric_data is None:
+                continue
+            result.present |= 1 << metric
+            base = metric * VALUES_PER_METRIC
+            p75 = metric_data.get('percentiles', {}).get('p75')
+            if p75 is not None:
+                values[base] = float(p75)
+            histogram = metric_data.get('histogram')
+            if histogram:
+                total_samples = sum(bucket.get('density', 0) for bucket in histogram)
+                if total_samples > 0:
+                    last = len(histogram) - 1
+                    for i, bucket in enumerate(histogram):
+                        ratio = bucket.get('density', 0) / total_samples
+                        if i == 0:
+                            values[base + 1] = ratio
+                        elif i == last:
+                            values[base + 3] = ratio
+                        elif values[base + 2] != values[base + 2]:
+                            values[base + 2] = ratio
+                        else:
+                            values[base + 2] += ratio
+        result.overall_performance = result.rate()
+        return result
+
+    @classmethod
+    def from_report(cls, report):
+        """Result for a stored CruxReport
+
+        Reports without a raw API response (mock and imported rows) are
+        rebuilt from their stored columns.
+        """
+        api_response = report.api_response if isinstance(report.api_response, dict) else {}
+        if 'record' in api_response:
+            result = cls.from_record(api_response, report.url, report.form_factor)
+        else:
+            result = cls(report.url, report.form_factor)
+            for metric, field in enumerate(METRIC_FIELDS):
+                value = getattr(report, field)
+                if value is not None:
+                    result.set_metric(metric, value)
+            result.overall_performance = result.rate()
+        result.created_at = report.created_at
+        result.report_id = report.id
+        result.collection_period = api_response.get('record', {}).get('collectionPeriod')
+        return result
+
+    def set_metric(self, metric, p75=None, good_ratio=None, needs_improvement_ratio=None, poor_ratio=None):
+        self.present |= 1 << metric
+        base = metric * VALUES_PER_METRIC
+        for offset, value in enumerate((p75, good_ratio, needs_improvement_ratio, poor_ratio)):
+            self.values[base + offset] = NAN if value is None else float(value)
+
+    def metrics(self):
+        """Metrics with an entry, in Metric order"""
+        present = self.present
+        return [_METRICS[index] for index in _METRIC_INDEXES if present >> index & 1]
+
+    def p75(self, metric):
+        return _optional(self.values[metric * VALUES_PER_METRIC])
+
+    def has_data(self):
+        """True when at least one metric has a p75 value"""
+        values = self.values
+        return any(not math.isnan(values[metric * VALUES_PER_METRIC]) for metric in self.metrics())
+
+    def rate(self):
+        """Overall performance from the Core Web Vitals' good ratios"""
+        return overall_rating([
+            _optional(self.values[metric * VALUES_PER_METRIC + 1])
+            for metric in CORE_VITALS if self.present >> metric & 1
+        ])
+
+    def to_dict(self):
+        """The public JSON shape analyze_urls and the session endpoints return"""
+        values = self.values
+        metrics = []
+        for metric in self.metrics():
+            base = metric * VALUES_PER_METRIC
+            metrics.append({
+                'metric_name': METRIC_NAMES[metric],
+                'p75_value': _p75_output(metric, values[base]),
+                'good_ratio': _optional(values[base + 1]),
+                'needs_improvement_ratio': _optional(values[base + 2]),
+                'poor_ratio': _optional(values[base + 3]),
+            })
+        created_at = self.created_at
+        if isinstance(created_at, float):
+            created_at = datetime.fromtimestamp(created_at).isoformat()
+        elif created_at is not None:
+            created_at = created_at.isoformat()
+        data = {
+            'url': self.url,
+            'form_factor': self.form_factor,
+            'metrics': metrics,
+            'overall_performance': self.overall_performance,
+            'created_at': created_at,
+        }
+        if self.report_id is not None:
+            data['report_id'] = self.report_id
+            data['collection_period'] = self.collection_period
+        if self.stale:
+            data['stale'] = True
+        return data
+
+
+def summarize(results):
+    """Per-metric average, best and worst p75 across results (lower is better)
+
+    Computed over one array of p75 values per metric instead of per-row
+    dicts; rounding and tie-breaking match the dict-based summary it replaced.
+    """
+    columns = {}
+    for result in results:
+        values = result.values
+        present = result.present
+        for metric in _METRIC_INDEXES:
+            if not present >> metric & 1:
+                continue
+            value = values[metric * VALUES_PER_METRIC]
+            if value != value:
+                continue
+            column = columns.get(metric)
+            if column is None:
+                column = columns[metric] = (array('d'), [])
+            column[0].append(value)
+            column[1].append(result.url)
+
+    summary = []
+    for metric, (p75s, urls) in columns.items():
+        # index() finds the first occurrence, like min()/max() over the rows would
+        best = p75s.index(min(p75s))
+        worst = p75s.index(max(p75s))
+        summary.append({
+            'metric_name': METRIC_NAMES[metric],
+            'average_p75': round(sum(p75s) / len(p75s), 2),
+            'best_url': urls[best],
+            'worst_url': urls[worst],
+            'best_value': round(p75s[best], 2),
+            'worst_value': round(p75s[worst], 2),
+        })
+    return summary
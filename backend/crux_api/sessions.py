@@ -0,0 +1,158 @@
+"""Loading stored analysis sessions and comparing two of them metric by metric"""
+from django.db.models import Count, F, Max, Q
+
+from .models import STORED_METRICS, AnalysisSession, CruxReport
+
+# Column -> (good upper bound, poor lower bound) of the p75 value, per web.dev
+METRIC_THRESHOLDS = {
+    'largest_contentful_paint': (2500, 4000),
+    'interaction_to_next_paint': (200, 500),
+    'cumulative_layout_shift': (0.1, 0.25),
+    'first_contentful_paint': (1800, 3000),
+    'first_input_delay': (100, 300),
+    'time_to_first_byte': (800, 1800),
+}
+RATINGS = ('Good', 'Needs Improvement', 'Poor')
+
+
+def rate(field, value):
+    """Good, Needs Improvement or Poor for a p75 value of the given column"""
+    if value is None:
+        return None
+    good, poor = METRIC_THRESHOLDS[field]
+    if value <= good:
+        return 'Good'
+    return 'Needs Improvement' if value <= poor else 'Poor'
+
+
+def load_session(session_id):
+    """The session and its reports: two indexed lookups whatever the session size
+
+    Raises AnalysisSession.DoesNotExist for unknown ids. The session row is
+    not joined onto the reports because its URL list would then be decoded
+    once per report.
+    """
+    session = AnalysisSession.objects.get(session_id=session_id)
+    return session, list(session.reports.order_by('id'))
+
+
+def reports_version(*sessions):
+    """Count, newest id and newest timestamp of the reports linked to ``sessions``
+
+    Sessions gain reports one URL at a time while an analysis runs, so
+    cache validators for derived views must change with them.
+    """
+    return CruxReport.objects.filter(session_id__in=[session.pk for session in sessions]).aggregate(
+        count=Count('id'), last_id=Max('id'), last_created=Max('created_at'),
+    )
+
+
+def diff_rows(base, head):
+    """One row per URL and form factor with both sessions' values and their deltas
+
+    The pivot and the deltas are computed by the database in a single
+    grouped query over the session foreign key index.
+    """
+    annotations = {'url': Max('url')}
+    for _, field in STORED_METRICS:
+        annotations[f'base_{field}'] = Max(field, filter=Q(session_id=base.pk))
+        annotations[f'head_{field}'] = Max(field, filter=Q(session_id=head.pk))
+    deltas = {
+        f'delta_{field}': F(f'head_{field}') - F(f'base_{field}')
+        for _, field in STORED_METRICS
+    }
+    return (
+        CruxReport.objects.filter(session_id__in=(base.pk, head.pk))
+        .order_by()
+        .values('url_key', 'form_factor')
+        .annotate(**annotations)
+        .annotate(**deltas)
+        .order_by('url')
+    )
+
+
+def diff_sessions(base, head, limit=50):
+    """Compare two sessions: per-URL changes, per-metric summary and ranked regressions
+
+    Higher is worse for every stored metric, so a positive delta is a
+    regression. Regressions are ranked by relative change so metrics with
+    different units can be compared.
+    """
+    summary = {
+        field: {
+            'metric_name': metric_name,
+            'compared': 0, 'improved': 0, 'regressed': 0, 'unchanged': 0,
+            'ratings_improved': 0, 'ratings_worsened': 0, 'total_delta': 0.0,
+        }
+        for metric_name, field in STORED_METRICS
+    }
+    changes = []
+    regressions = []
+    only_base = only_head = 0
+
+    for row in diff_rows(base, head):
+        metrics = []
+        in_base = in_head = False
+        for metric_name, field in STORED_METRICS:
+            before, after, delta = row[f'base_{field}'], row[f'head_{field}'], row[f'delta_{field}']
+            in_base |= before is not None
+            in_head |= after is not None
+            if delta is None:
+                continue
+            before_rating, after_rating = rate(field, before), rate(field, after)
+            change = {
+                'metric_name': metric_name,
+                'base': before,
+                'head': after,
+                'delta': delta,
+                'relative_delta': round(delta / before, 4) if before else None,
+                'base_rating': before_rating,
+                'head_rating': after_rating,
+            }
+            metrics.append(change)
+
+            stats = summary[field]
+            stats['compared'] += 1
+            stats['total_delta'] += delta
+            if delta > 0:
+                stats['regressed'] += 1
+                regressions.append({'url': row['url'], 'form_factor': row['form_factor'], **change})
+            elif delta < 0:
+                stats['improved'] += 1
+            else:
+                stats['unchanged'] += 1
+            before_rank, after_rank = RATINGS.index(before_rating), RATINGS.index(after_rating)
+            if after_rank < before_rank:
+                stats['ratings_improved'] += 1
+            elif after_rank > before_rank:
+                stats['ratings_worsened'] += 1
+
+        if metrics:
+            changes.append({'url': row['url'], 'form_factor': row['form_factor'], 'metrics': metrics})
+        elif in_base and not in_head:
+            only_base += 1
+        elif in_head and not in_base:
+            only_head += 1
+
+    # Rating flips first, then by relative size; a zero baseline sorts as the largest change
+    regressions.sort(key=lambda change: (
+        RATINGS.index(change['head_rating']) - RATINGS.index(change['base_rating']),
+        change['relative_delta'] if change['relative_delta'] is not None else float('inf'),
+    ), reverse=True)
+
+    metric_summary = []
+    for stats in summary.values():
+        if not stats['compared']:
+            continue
+        total_delta = stats.pop('total_delta')
+        stats['mean_delta'] = round(total_delta / stats['compared'], 4)
+        metric_summary.append(stats)
+
+    return {
+        'compared_urls': len(changes),
+        'only_in_base': only_base,
+        'only_in_head': only_head,
+        'summary': metric_summary,
+        'regressions': regressions[:limit],
+        'changes': changes,
+    }
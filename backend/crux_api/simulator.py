@@ -0,0 +1,202 @@
+"""Local stand-in for the CrUX API serving seeded, realistic responses"""
+import hashlib
+import json
+import logging
+import random
+import threading
+import math
+import time
+from collections import defaultdict, deque
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+QUERY_PATH = '/v1/records:queryRecord'
+
+# Metric key -> (good threshold, poor threshold, typical p75, spread, is CLS)
+METRIC_PROFILES = {
+    'largest_contentful_paint': (2500, 4000, 2300, 0.45, False),
+    'interaction_to_next_paint': (200, 500, 180, 0.55, False),
+    'cumulative_layout_shift': (0.1, 0.25, 0.08, 0.8, True),
+    'first_contentful_paint': (1800, 3000, 1600, 0.4, False),
+    'first_input_delay': (100, 300, 40, 0.6, False),
+    'time_to_first_byte': (800, 1800, 700, 0.5, False),
+}
+
+
+def _rng_for(*parts):
+    digest = hashlib.blake2b('|'.join(str(part) for part in parts).encode('utf-8'), digest_size=8).digest()
+    return random.Random(int.from_bytes(digest, 'little'))
+
+
+def _histogram(rng, good, poor, p75, is_cls):
+    """Three-bucket histogram whose shape agrees with the p75 value"""
+    if p75 <= good:
+        good_density = rng.uniform(0.75, 0.95)
+    elif p75 <= poor:
+        good_density = rng.uniform(0.45, 0.75)
+    else:
+        good_density = rng.uniform(0.15, 0.45)
+    poor_density = (1 - good_density) * rng.uniform(0.2, 0.6)
+    middle_density = 1 - good_density - poor_density
+
+    def bound(value):
+        return f"{value:.2f}" if is_cls else int(value)
+
+    return [
+        {'start': bound(0), 'end': bound(good), 'density': round(good_density, 4)},
+        {'start': bound(good), 'end': bound(poor), 'density': round(middle_density, 4)},
+        {'start': bound(poor), 'density': round(poor_density, 4)},
+    ]
+
+
+def fake_record(key, form_factor='ALL_FORM_FACTORS', seed=0, metrics=None, key_type='url', last_date=None):
+    """Build a queryRecord response body for a URL or origin
+
+    The same (key, form factor, seed, period) always yields the same record.
+    """
+    last_date = last_date or date.today() - timedelta(days=2)
+    rng = _rng_for(seed, key, form_factor, last_date.isoformat())
+    # Per-site quality factor so one page is consistently fast or slow across metrics
+    quality = rng.lognormvariate(0, 0.35)
+
+    record_metrics = {}
+    for metric_key in metrics or METRIC_PROFILES:
+        if metric_key not in METRIC_PROFILES:
+            continue
+        good, poor, typical, spread, is_cls = METRIC_PROFILES[metric_key]
+        p75 = typical * quality * rng.lognormvariate(0, spread / 2)
+        record_metrics[metric_key] = {
+            'histogram': _histogram(rng, good, poor, p75, is_cls),
+            'percentiles': {'p75': f"{p75:.2f}" if is_cls else int(p75)},
+        }
+
+    first_date = last_date - timedelta(days=27)
+    response = {
+        'record': {
+            'key': {key_type: key, **({} if form_factor == 'ALL_FORM_FACTORS' else {'formFactor': form_factor})},
+            'metrics': record_metrics,
+            'collectionPeriod': {
+                'firstDate': {'year': first_date.year, 'month': first_date.month, 'day': first_date.day},
+                'lastDate': {'year': last_date.year, 'month': last_date.month, 'day': last_date.day},
+            },
+        },
+    }
+    if key_type == 'url':
+        response['urlNormalizationDetails'] = {'originalUrl': key, 'normalizedUrl': key}
+    return response
+
+
+class SimulatorConfig:
+    """Behaviour knobs for the simulated upstream"""
+
+    def __init__(self, seed=0, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0,
+                 rate_limit_rate=0.0, no_data_rate=0.0, retry_after=1, quota=0, quota_window=60.0):
+        self.seed = seed
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.no_data_rate = no_data_rate
+        self.retry_after = retry_after
+        # Per-key calls allowed per quota_window seconds, like the real API; 0 disables
+        self.quota = quota
+        self.quota_window = quota_window
+
+
+class CruxSimulatorHandler(BaseHTTPRequestHandler):
+    server_version = 'CruxSimulator/1.0'
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _error(self, status, message, state, headers=None):
+        self._send_json(status, {'error': {'code': status, 'message': message, 'status': state}}, headers)
+
+    def _over_quota(self, config):
+        """Seconds until the request's key has quota again, or 0 if it has quota now"""
+        key = parse_qs(urlsplit(self.path).query).get('key', [''])[0]
+        now = time.monotonic()
+        with self.server.lock:
+            calls = self.server.calls_by_key[key]
+            while calls and calls[0] <= now - config.quota_window:
+                calls.popleft()
+            if len(calls) >= config.quota:
+                return calls[0] + config.quota_window - now
+            calls.append(now)
+        return 0
+
+    def do_POST(self):
+        if self.path.split('?', 1)[0] != QUERY_PATH:
+            return self._error(404, 'Not found', 'NOT_FOUND')
+
+        config = self.server.config
+        if config.quota:
+            wait = self._over_quota(config)
+            if wait:
+                return self._error(429, 'Quota exceeded for quota metric', 'RESOURCE_EXHAUSTED',
+                                   {'Retry-After': str(max(1, math.ceil(wait)))})
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return self._error(400, 'Invalid JSON payload', 'INVALID_ARGUMENT')
+
+        with self.server.lock:
+            roll = self.server.rng.random()
+            delay = max(0.0, self.server.rng.gauss(config.latency_ms, config.jitter_ms)) if config.latency_ms else 0.0
+        if delay:
+            time.sleep(delay / 1000)
+
+        if roll < config.rate_limit_rate:
+            return self._error(429, 'Quota exceeded', 'RESOURCE_EXHAUSTED', {'Retry-After': str(config.retry_after)})
+        if roll < config.rate_limit_rate + config.error_rate:
+            return self._error(503, 'The service is currently unavailable', 'UNAVAILABLE')
+
+        key_type = 'url' if 'url' in body else 'origin'
+        key = body.get(key_type)
+        if not key:
+            return self._error(400, 'url or origin is required', 'INVALID_ARGUMENT')
+        form_factor = body.get('formFactor', 'ALL_FORM_FACTORS')
+
+        # Page-level data is missing for a stable subset of URLs; origins always have data
+        if key_type == 'url' and _rng_for(config.seed, 'no-data', key).random() < config.no_data_rate:
+            return self._error(404, 'chrome ux report data not found', 'NOT_FOUND')
+
+        self._send_json(200, fake_record(key, form_factor, config.seed, body.get('metrics'), key_type))
+
+
+class CruxSimulator(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config=None):
+        super().__init__(address, CruxSimulatorHandler)
+        self.config = config or SimulatorConfig()
+        self.rng = random.Random(self.config.seed)
+        self.lock = threading.Lock()
+        self.calls_by_key = defaultdict(deque)
+
+    @property
+    def api_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{QUERY_PATH}"
+
+
+def start_simulator(host='127.0.0.1', port=0, config=None):
+    """Start a simulator on a background thread and return it"""
+    server = CruxSimulator((host, port), config)
+    thread = threading.Thread(target=server.serve_forever, name='crux-simulator', daemon=True)
+    thread.start()
+    return server
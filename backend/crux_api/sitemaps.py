@@ -0,0 +1,236 @@
+"""Streaming sitemap and sitemap-index parsing for URL discovery"""
+import gzip
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+from collections import deque
+from urllib.parse import urlsplit
+from xml.etree.ElementTree import iterparse, ParseError
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .canonical import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b'\x1f\x8b'
+# Bytes of the per-URL digest kept for deduplication
+SEEN_DIGEST_SIZE = 16
+# Page cache of each SeenURLs table; the rest of the table lives in a temporary file
+SEEN_CACHE_KIB = 8 * 1024
+
+
+def default_fetcher(location):
+    """Open a sitemap location as a binary stream
+
+    Local paths are opened directly; http(s) locations are streamed with
+    requests so the document is never held in memory as a whole.
+    """
+    if location.startswith(('http://', 'https://')):
+        import requests
+
+        response = requests.get(location, stream=True, timeout=(10, 60))
+        response.raise_for_status()
+        response.raw.decode_content = True
+        return response.raw
+    return open(os.path.expanduser(location), 'rb')
+
+
+def get_fetcher():
+    """Return the fetcher configured by CRUX_SITEMAP_FETCHER, if any"""
+    fetcher = getattr(settings, 'CRUX_SITEMAP_FETCHER', None)
+    if fetcher:
+        return import_string(fetcher) if isinstance(fetcher, str) else fetcher
+    return default_fetcher
+
+
+class _PeekableStream:
+    """Wrap a binary stream so its first bytes can be inspected"""
+
+    def __init__(self, stream, size=2):
+        self.stream = stream
+        self.head = stream.read(size)
+
+    def read(self, size=-1):
+        if not self.head:
+            return self.stream.read(size)
+        if size is None or size < 0:
+            data, self.head = self.head + self.stream.read(), b''
+            return data
+        data, self.head = self.head[:size], self.head[size:]
+        if len(data) < size:
+            data += self.stream.read(size - len(data))
+        return data
+
+    def close(self):
+        self.stream.close()
+
+
+def open_sitemap(location, fetcher=None):
+    """Open a sitemap, transparently decompressing .xml.gz content"""
+    stream = _PeekableStream((fetcher or get_fetcher())(location))
+    if stream.head == GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=stream, mode='rb')
+    return stream
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def iter_sitemap_entries(stream):
+    """Yield ('url' | 'sitemap', loc) pairs from a sitemap or sitemap index
+
+    Elements are cleared as soon as their <loc> has been read, so memory
+    stays constant regardless of document size. Malformed or truncated XML
+    raises ParseError after the entries read before the error.
+    """
+    root = None
+    for event, element in iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+            continue
+        name = _local_name(element.tag)
+        if name in ('url', 'sitemap'):
+            for child in element:
+                if _local_name(child.tag) == 'loc' and child.text:
+                    yield name, child.text.strip()
+                    break
+            # Drop the finished entry and its siblings held by the root
+            element.clear()
+            root.clear()
+
+
+class SeenURLs:
+    """Exact set of URLs already seen, with memory bounded however many there are
+
+    A 16-byte blake2b digest per URL is kept in a private SQLite database:
+    an empty filename gives a temporary file that SQLite deletes on close,
+    and only ``cache_kib`` of its pages stay in memory. Lookups cost a few
+    microseconds, well below parsing the sitemap entry itself.
+    """
+
+    def __init__(self, cache_kib=SEEN_CACHE_KIB):
+        self.db = sqlite3.connect('', isolation_level=None)
+        self.db.execute(f'PRAGMA cache_size = -{int(cache_kib)}')
+        self.db.execute('PRAGMA journal_mode = OFF')
+        self.db.execute('PRAGMA synchronous = OFF')
+        self.db.execute('CREATE TABLE seen (digest BLOB PRIMARY KEY) WITHOUT ROWID')
+        # Nothing needs to survive the run, so one open transaction avoids per-insert commits
+        self.db.execute('BEGIN')
+        self.count = 0
+
+    def add(self, url):
+        """Add a URL; return True if it was already present"""
+        digest = hashlib.blake2b(url.encode('utf-8'), digest_size=SEEN_DIGEST_SIZE).digest()
+        if self.db.execute('INSERT OR IGNORE INTO seen VALUES (?)', (digest,)).rowcount == 0:
+            return True
+        self.count += 1
+        return False
+
+    def close(self):
+        self.db.close()
+
+    def __len__(self):
+        return self.count
+
+
+def _stable_fraction(value):
+    digest = hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') / 2 ** 64
+
+
+def path_pattern(url, depth=1):
+    """Group key for sampling: the first ``depth`` path segments, digits masked"""
+    segments = [segment for segment in urlsplit(url).path.split('/') if segment][:depth]
+    return '/' + '/'.join(re.sub(r'\d+', '{n}', segment) for segment in segments)
+
+
+class SitemapDiscovery:
+    """Walk sitemaps and sitemap indexes and yield normalized, unique URLs"""
+
+    def __init__(self, fetcher=None, include=None, exclude=None, per_pattern=None,
+                 pattern_depth=1, sample_rate=None, limit=None, max_depth=5):
+        self.fetcher = fetcher or get_fetcher()
+        self.include = [re.compile(pattern) for pattern in include or []]
+        self.exclude = [re.compile(pattern) for pattern in exclude or []]
+        self.per_pattern = per_pattern
+        self.pattern_depth = pattern_depth
+        self.sample_rate = sample_rate
+        self.limit = limit
+        self.max_depth = max_depth
+        self.seen = SeenURLs()
+        self.visited = SeenURLs(cache_kib=1024)
+        self.pattern_counts = {}
+        # failed: sitemaps that could not be opened or parsed completely
+        self.stats = {'sitemaps': 0, 'failed': 0, 'entries': 0, 'duplicates': 0, 'filtered': 0, 'emitted': 0}
+
+    def _accept(self, url):
+        if self.include or self.exclude:
+            path = urlsplit(url).path or '/'
+            if self.include and not any(pattern.search(path) for pattern in self.include):
+                return False
+            if any(pattern.search(path) for pattern in self.exclude):
+                return False
+        if self.sample_rate is not None and _stable_fraction(url) >= self.sample_rate:
+            return False
+        if self.per_pattern:
+            key = path_pattern(url, self.pattern_depth)
+            count = self.pattern_counts.get(key, 0)
+            if count >= self.per_pattern:
+                return False
+            self.pattern_counts[key] = count + 1
+        return True
+
+    def discover(self, locations):
+        """Yield URLs from the given sitemap locations in document order"""
+        pending = deque((location, 0) for location in locations)
+        while pending:
+            location, depth = pending.popleft()
+            if self.visited.add(location):
+                continue
+            self.stats['sitemaps'] += 1
+            try:
+                stream = open_sitemap(location, self.fetcher)
+            except Exception as e:
+                logger.error("Could not open sitemap %s: %s", location, e)
+                self.stats['failed'] += 1
+                continue
+            try:
+                for kind, loc in iter_sitemap_entries(stream):
+                    if kind == 'sitemap':
+                        if depth < self.max_depth:
+                            pending.append((loc, depth + 1))
+                        else:
+                            logger.warning("Skipping nested sitemap %s: max depth reached", loc)
+                        continue
+                    self.stats['entries'] += 1
+                    url = canonicalize_url(loc)
+                    if url is None:
+                        self.stats['filtered'] += 1
+                        continue
+                    if self.seen.add(url):
+                        self.stats['duplicates'] += 1
+                        continue
+                    if not self._accept(url):
+                        self.stats['filtered'] += 1
+                        continue
+                    self.stats['emitted'] += 1
+                    yield url
+                    if self.limit and self.stats['emitted'] >= self.limit:
+                        return
+            except (ParseError, EOFError, OSError) as e:
+                # Malformed XML or a truncated (gzip) stream: entries before the error were kept
+                logger.error("Could not parse sitemap %s: %s", location, e)
+                self.stats['failed'] += 1
+            finally:
+                stream.close()
+
+    def close(self):
+        """Drop the on-disk dedupe tables"""
+        self.seen.close()
+        self.visited.close()
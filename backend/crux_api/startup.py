@@ -0,0 +1,125 @@
+"""Worker startup timing and an optional warm-up run before the worker takes traffic
+
+Django imports the URLconf, and with it every view module, on the first
+request, and the CrUX client stack is only imported when the first
+analysis needs it. That keeps idle and read-only workers light, but the
+first request after a scale-up pays for it. warm_up() moves that work to
+boot time; set CRUX_WARMUP=true to run it from wsgi.py.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.urls import get_resolver
+
+from .instrumentation import STARTUP_SECONDS
+
+logger = logging.getLogger(__name__)
+
+_phases = {}
+_first_request = {}
+_lock = threading.Lock()
+_imported_at = time.monotonic()
+_fork_hooks_registered = False
+
+
+def process_uptime():
+    """Seconds since this process started, or since this module was imported where /proc is unavailable"""
+    try:
+        with open('/proc/self/stat', encoding='ascii') as handle:
+            # Fields after the parenthesised command name; starttime is the 22nd field overall
+            start_ticks = int(handle.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime', encoding='ascii') as handle:
+            uptime = float(handle.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError):
+        return time.monotonic() - _imported_at
+
+
+def record_phase(name, seconds):
+    _phases[name] = seconds
+    STARTUP_SECONDS.set(seconds, phase=name)
+
+
+@contextmanager
+def timed_phase(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - started)
+
+
+def _first_request_started(sender, **kwargs):
+    with _lock:
+        _first_request.setdefault('started', time.perf_counter())
+
+
+def _first_request_finished(sender, **kwargs):
+    with _lock:
+        started = _first_request.get('started')
+        if started is None or 'finished' in _first_request:
+            return
+        _first_request['finished'] = time.perf_counter()
+    record_phase('first_request', _first_request['finished'] - started)
+    record_phase('time_to_first_request', process_uptime())
+    request_started.disconnect(dispatch_uid='crux_api.startup.first_request_started')
+    request_finished.disconnect(dispatch_uid='crux_api.startup.first_request_finished')
+
+
+def watch_first_request():
+    """Record the duration of this worker's first request and its age when it completes"""
+    request_started.connect(_first_request_started, dispatch_uid='crux_api.startup.first_request_started')
+    request_finished.connect(_first_request_finished, dispatch_uid='crux_api.startup.first_request_finished')
+
+
+def _close_connections_before_fork():
+    # A preforking server (gunicorn --preload) must not share sockets with its workers
+    connections.close_all()
+
+
+def _open_connections_after_fork():
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+def warm_up(preconnect=None):
+    """Import the request and analysis paths and open connections ahead of traffic
+
+    Loads the URLconf and crux_api.analysis, builds the process-wide key
+    pool and upstream client, optionally opens a keep-alive connection to
+    the CrUX API host (no API key is sent, so no quota is used) and
+    connects to every configured database. Database connections belong to
+    the thread that opens them, so only a worker's main thread (gunicorn
+    sync workers) reuses them; in a preforking master they are closed
+    before fork and reopened in each child.
+    """
+    global _fork_hooks_registered
+    if preconnect is None:
+        preconnect = settings.CRUX_WARMUP_PRECONNECT
+    with timed_phase('warmup'):
+        with timed_phase('warmup_imports'):
+            get_resolver().url_patterns  # imports every view module
+            from .analysis import CruxAPIClient
+        with timed_phase('warmup_client'):
+            client = CruxAPIClient()
+        if preconnect and client.key_pool:
+            with timed_phase('warmup_preconnect'):
+                client.upstream.preconnect(settings.CRUX_API_URL)
+        with timed_phase('warmup_db'):
+            for connection in connections.all():
+                connection.ensure_connection()
+    if hasattr(os, 'register_at_fork') and not _fork_hooks_registered:
+        os.register_at_fork(before=_close_connections_before_fork, after_in_child=_open_connections_after_fork)
+        _fork_hooks_registered = True
+    logger.info("Worker warmed up in %.1f ms", _phases['warmup'] * 1000)
+
+
+def startup_snapshot():
+    """Recorded startup phases in milliseconds, for the health check"""
+    return {name: round(seconds * 1000, 3) for name, seconds in _phases.items()}
@@ -0,0 +1,153 @@
+"""Seeded synthetic CrUX history for load-testing the storage, query and export paths"""
+import json
+import logging
+import random
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import connection, transaction
+
+from .bulk_import import iter_bounded, report_insert_sql
+from .canonical import canonical_fields
+from .models import AnalysisSession, CruxReport
+from .simulator import METRIC_PROFILES, fake_record
+from .workers import process_pool
+
+logger = logging.getLogger(__name__)
+
+SECTIONS = ('', 'blog', 'products', 'docs', 'news', 'category', 'help', 'account')
+SESSION_PREFIX = 'synthetic'
+# Marker stored in api_response so generated rows can be told apart and cleared
+MARKER = 'synthetic'
+METRIC_FIELDS = tuple(METRIC_PROFILES)
+# Columns filled by generate_block, in order; created_at and session_id are appended on insert
+REPORT_COLUMNS = ('url', 'canonical_url', 'url_key', 'form_factor', *METRIC_FIELDS, 'api_response')
+
+
+def synthetic_url(seed, index, pages_per_site=200):
+    """The ``index``-th generated URL; sites share sections but not pages"""
+    site, page = divmod(index, pages_per_site)
+    if page == 0:
+        return f"https://www.site{site:06d}.example/"
+    rng = random.Random(f"{seed}:{index}")
+    section = rng.choice(SECTIONS)
+    slug = f"{section}/page-{page}" if section else f"page-{page}"
+    return f"https://www.site{site:06d}.example/{slug}"
+
+
+def period_end_dates(periods, interval_days=28, end_date=None):
+    """Last days of ``periods`` collection periods, oldest first"""
+    end_date = end_date or datetime.now(dt_timezone.utc).date() - timedelta(days=2)
+    return [end_date - timedelta(days=interval_days * offset) for offset in range(periods - 1, -1, -1)]
+
+
+def session_id_for(seed, last_date, form_factor, block):
+    return f"{SESSION_PREFIX}-{seed}-{last_date:%Y%m%d}-{form_factor}-{block}"
+
+
+def period_timestamp(last_date):
+    return datetime.combine(last_date, time(hour=12), tzinfo=dt_timezone.utc)
+
+
+def generate_block(seed, block, block_size, url_count, last_dates, form_factors, raw=True, pages_per_site=200):
+    """Insert parameters for one block of URLs over every period and form factor
+
+    Returns ``(block_urls, rows)`` where each row is ``(period_index,
+    form_factor, values)`` and ``values`` follow REPORT_COLUMNS with the API
+    response already serialized. Runs in worker processes, so it only
+    touches plain data.
+    """
+    start = block * block_size
+    urls = [synthetic_url(seed, index, pages_per_site) for index in range(start, min(start + block_size, url_count))]
+    keys = [canonical_fields(url) for url in urls]
+    rows = []
+    for period_index, last_date in enumerate(last_dates):
+        for form_factor in form_factors:
+            for url, fields in zip(urls, keys):
+                response = fake_record(url, form_factor, seed=seed, last_date=last_date)
+                metrics = response['record']['metrics']
+                api_response = response if raw else {}
+                api_response[MARKER] = seed
+                rows.append((period_index, form_factor, (
+                    url, fields['canonical_url'], fields['url_key'], form_factor,
+                    *(float(metrics[field]['percentiles']['p75']) if field in metrics else None
+                      for field in METRIC_FIELDS),
+                    json.dumps(api_response),
+                )))
+    return urls, rows
+
+
+def _insert_block(seed, block, urls, rows, last_dates, batch_size):
+    """Insert one block's sessions and reports in a single transaction
+
+    Reports skip model instantiation and go straight to executemany, which
+    is several times faster than bulk_create at this volume.
+    """
+    sessions = {}
+    for period_index, form_factor, _ in rows:
+        if (period_index, form_factor) not in sessions:
+            last_date = last_dates[period_index]
+            sessions[(period_index, form_factor)] = AnalysisSession(
+                session_id=session_id_for(seed, last_date, form_factor, block),
+                urls=urls,
+                created_at=period_timestamp(last_date),
+            )
+    created_at = [
+        connection.ops.adapt_datetimefield_value(period_timestamp(last_date)) for last_date in last_dates
+    ]
+    sql = report_insert_sql((*REPORT_COLUMNS, 'created_at', 'session_id'))
+    with transaction.atomic():
+        # Session primary keys come back from bulk_create on SQLite and PostgreSQL
+        AnalysisSession.objects.bulk_create(sessions.values(), batch_size=batch_size)
+        params = [
+            (*values, created_at[period_index], sessions[(period_index, form_factor)].pk)
+            for period_index, form_factor, values in rows
+        ]
+        with connection.cursor() as cursor:
+            for start in range(0, len(params), batch_size):
+                cursor.executemany(sql, params[start:start + batch_size])
+    return len(sessions), len(rows)
+
+
+def generate_synthetic_data(url_count, periods=12, interval_days=28, form_factors=('ALL_FORM_FACTORS',),
+                            seed=0, end_date=None, block_size=100, batch_size=5000, workers=0, raw=True,
+                            pages_per_site=200, progress=None):
+    """Bulk-load ``url_count`` URLs x ``periods`` x ``form_factors`` synthetic reports
+
+    Every block of ``block_size`` URLs becomes one AnalysisSession per
+    period and form factor. The same seed and end date always produce the
+    same rows. With ``workers`` > 0 records are generated in a process pool
+    while the main process keeps inserting.
+    """
+    last_dates = period_end_dates(periods, interval_days, end_date)
+    blocks = range((url_count + block_size - 1) // block_size)
+    stats = {'sessions': 0, 'reports': 0}
+    args = (block_size, url_count, last_dates, tuple(form_factors), raw, pages_per_site)
+
+    def commit(block, urls, rows):
+        sessions, reports = _insert_block(seed, block, urls, rows, last_dates, batch_size)
+        stats['sessions'] += sessions
+        stats['reports'] += reports
+        if progress:
+            progress(stats)
+
+    if workers > 0:
+        with process_pool(workers) as executor:
+            work = ((seed, block, *args) for block in blocks)
+            for (_, block, *_), (urls, rows) in iter_bounded(executor, generate_block, work, workers * 2):
+                commit(block, urls, rows)
+    else:
+        for block in blocks:
+            commit(block, *generate_block(seed, block, *args))
+    return stats
+
+
+def clear_synthetic_data(seed=None):
+    """Delete generated reports and sessions (of one seed, or all of them)"""
+    reports = CruxReport.objects.filter(api_response__has_key=MARKER)
+    prefix = f"{SESSION_PREFIX}-"
+    if seed is not None:
+        reports = reports.filter(**{f'api_response__{MARKER}': seed})
+        prefix = f"{SESSION_PREFIX}-{seed}-"
+    deleted_reports, _ = reports.delete()
+    deleted_sessions, _ = AnalysisSession.objects.filter(session_id__startswith=prefix).delete()
+    return deleted_reports, deleted_sessions
@@ -0,0 +1,127 @@
+"""Opt-in per-request tracing: Server-Timing headers and slow-request profiles"""
+import contextvars
+import logging
+import os
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_current_trace = contextvars.ContextVar('crux_request_trace', default=None)
+
+
+class RequestTrace:
+    """Accumulated time and call counts per span name for one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}
+
+    def add(self, name, seconds):
+        total, count = self.spans.get(name, (0.0, 0))
+        self.spans[name] = (total + seconds, count + 1)
+
+    def server_timing(self, total_seconds):
+        entries = []
+        for name, (seconds, count) in self.spans.items():
+            entries.append(f'{name};desc="{count} call{"s" if count != 1 else ""}";dur={seconds * 1000:.1f}')
+        entries.append(f'total;dur={total_seconds * 1000:.1f}')
+        return ', '.join(entries)
+
+
+@contextmanager
+def span(name):
+    """Time the block under ``name`` when the current request is traced"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter() - started)
+
+
+def _query_wrapper(execute, sql, params, many, context):
+    with span('db'):
+        return execute(sql, params, many, context)
+
+
+def _start_profiler():
+    import cProfile
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler (or sys.monitoring tool) already owns this thread
+        return None
+    return profiler
+
+
+class RequestTracingMiddleware:
+    """Record spans around upstream calls, ORM queries and rendering
+
+    Enabled with CRUX_TRACING_ENABLED. Every traced response carries a
+    Server-Timing header; requests slower than CRUX_TRACE_SLOW_MS are logged
+    and, when sampled by CRUX_PROFILE_SAMPLE_RATE, their cProfile stats are
+    written to CRUX_PROFILE_DIR.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'CRUX_TRACING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_seconds = getattr(settings, 'CRUX_TRACE_SLOW_MS', 1000) / 1000
+        self.sample_rate = getattr(settings, 'CRUX_PROFILE_SAMPLE_RATE', 0.0)
+        self.profile_dir = getattr(settings, 'CRUX_PROFILE_DIR', None)
+
+    def __call__(self, request):
+        trace = RequestTrace()
+        token = _current_trace.set(trace)
+        profiler = None
+        if self.sample_rate and self.profile_dir and random.random() < self.sample_rate:
+            profiler = _start_profiler()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(_query_wrapper))
+                response = self.get_response(request)
+        finally:
+            if profiler:
+                profiler.disable()
+            _current_trace.reset(token)
+
+        total = time.perf_counter() - trace.started
+        response['Server-Timing'] = trace.server_timing(total)
+        if total >= self.slow_seconds:
+            logger.warning("Slow request %s %s: %s", request.method, request.path, response['Server-Timing'])
+            if profiler:
+                self._dump_profile(profiler, request, total)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook; time the render itself
+        trace = _current_trace.get()
+        if trace is not None:
+            started = time.perf_counter()
+            response.add_post_render_callback(lambda rendered: trace.add('render', time.perf_counter() - started))
+        return response
+
+    def _dump_profile(self, profiler, request, total):
+        match = getattr(request, 'resolver_match', None)
+        view = match.url_name if match and match.url_name else 'unmatched'
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(
+            self.profile_dir,
+            f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{view}-{total * 1000:.0f}ms.pstats",
+        )
+        profiler.dump_stats(path)
+        logger.warning("Wrote profile for slow %s request to %s", view, path)
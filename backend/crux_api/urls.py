@@ -4,7 +4,12 @@ from . import views
 urlpatterns = [
     path('analyze/', views.analyze_urls, name='analyze_urls'),
     path('history/', views.get_analysis_history, name='analysis_history'),
+    path('analysis/', views.get_url_analysis, name='url_analysis'),
+    path('sessions/<str:session_id>/', views.get_analysis_session, name='analysis_session'),
+    path('sessions/<str:session_id>/diff/<str:other_session_id>/', views.diff_analysis_sessions, name='analysis_session_diff'),
+    path('export/', views.export_reports, name='export_reports'),
     path('health/', views.health_check, name='health_check'),
+    path('metrics/', views.metrics, name='metrics'),
     path('debug/mock/', views.debug_mock_data, name='debug_mock_data'),
     path('debug/multiple/', views.debug_multiple_urls, name='debug_multiple_urls'),
 ]
\ No newline at end of file
@@ -1,7 +1,8 @@
-import requests
 import logging
+import sys
 from django.conf import settings
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from rest_framework import status
@@ -9,10 +10,24 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from .models import CruxReport, AnalysisSession
+from .bulk_export import (
+    CONTENT_TYPES, DATASETS, EXPORT_FORMATS, export_filename, stream_export,
+)
+from .caching import not_modified, resource_etag, set_validators
+from .canonical import url_key
+from .filters import FORM_FACTORS, filter_reports
+from .results import AnalysisResult, Metric, summarize
+from .sessions import diff_sessions, load_session, reports_version
+from .startup import startup_snapshot
+from .tracing import span
+from .instrumentation import DB_WRITE_TIME, FALLBACKS, REGISTRY, SUMMARY_TIME
 from datetime import datetime
 import uuid
 import json
 
+# The CrUX client stack (analysis, keypool and with them requests) is imported
+# inside the views that need it, so serving stored data never loads it
+
 logger = logging.getLogger(__name__)
 
 @csrf_exempt
@@ -26,40 +41,18 @@ def debug_multiple_urls(request):
         # Simulate the same logic as analyze_urls
         results = []
         for i, url in enumerate(test_urls):
-            base_lcp = 2000.0 + (i * 200.0)  # Ensure float
-            base_inp = 50.0 + (i * 25.0)     # Ensure float
-            base_cls = 0.05 + (i * 0.02)     # Ensure float
-            
-            results.append({
-                'url': url,
-                'form_factor': 'ALL_FORM_FACTORS',
-                'metrics': [
-                    {
-                        'metric_name': 'Largest Contentful Paint (LCP)',
-                        'p75_value': base_lcp,
-                        'good_ratio': 0.8 - (i * 0.1),
-                        'needs_improvement_ratio': 0.15,
-                        'poor_ratio': 0.05 + (i * 0.1)
-                    },
-                    {
-                        'metric_name': 'Interaction to Next Paint (INP)',
-                        'p75_value': base_inp,
-                        'good_ratio': 0.85 - (i * 0.05),
-                        'needs_improvement_ratio': 0.10,
-                        'poor_ratio': 0.05 + (i * 0.05)
-                    }
-                ],
-                'overall_performance': 'Good' if i == 0 else 'Needs Improvement',
-                'created_at': datetime.now().isoformat()
-            })
+            result = AnalysisResult(url, 'ALL_FORM_FACTORS', 'Good' if i == 0 else 'Needs Improvement')
+            result.set_metric(Metric.LCP, 2000.0 + (i * 200.0), 0.8 - (i * 0.1), 0.15, 0.05 + (i * 0.1))
+            result.set_metric(Metric.INP, 50.0 + (i * 25.0), 0.85 - (i * 0.05), 0.10, 0.05 + (i * 0.05))
+            results.append(result)
         
         # Test summary calculation
-        summary = calculate_summary_statistics(results)
+        summary = summarize(results)
         
         return Response({
             'debug': True,
             'message': 'Multiple URL analysis test',
-            'results': results,
+            'results': [result.to_dict() for result in results],
             'summary': summary,
             'timestamp': datetime.now().isoformat()
         })
@@ -117,18 +110,42 @@ def debug_mock_data(request):
 @permission_classes([AllowAny])
 def health_check(request):
     """Health check endpoint"""
+    # The key pool is loaded by the first analysis; before that no key has been used in
+    # this worker, and importing it here would pull in requests on every health probe
+    keypool = sys.modules.get('crux_api.keypool')
     return Response({
         'status': 'healthy', 
         'timestamp': datetime.now().isoformat(),
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'api_keys': keypool.get_key_pool().snapshot() if keypool else None,
+        'startup': startup_snapshot()
     })
 
+@require_GET
+def metrics(request):
+    """Prometheus scrape endpoint for this worker's metrics"""
+    return HttpResponse(REGISTRY.expose(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_analysis_history(request):
     """Get historical analysis data"""
     try:
-        reports = CruxReport.objects.all()[:50]  # Last 50 reports
+        try:
+            reports = filter_reports(CruxReport.objects.all(), request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        reports = reports.only('id', 'url', 'form_factor', 'largest_contentful_paint', 'created_at')[:50]  # Last 50 reports
+        reports = list(reports)
+        
+        # The listed rows are the resource version; polling clients get a 304
+        etag = resource_etag(request, *(report.id for report in reports))
+        last_modified = max((report.created_at for report in reports), default=None)
+        max_age = settings.CRUX_HISTORY_CACHE_MAX_AGE
+        cached = not_modified(request, etag, last_modified, max_age)
+        if cached is not None:
+            return cached
+        
         data = []
         for report in reports:
             data.append({
@@ -138,16 +155,150 @@ def get_analysis_history(request):
                 'overall_performance': 'Good' if report.largest_contentful_paint and report.largest_contentful_paint < 2500 else 'Needs Improvement',
                 'created_at': report.created_at.isoformat()
             })
-        return Response(data)
+        return set_validators(Response(data), etag, last_modified, max_age)
     except Exception as e:
-        logger.error(f"Error fetching analysis history: {str(e)}")
+        logger.error("Error fetching analysis history: %s", e)
         return Response({'error': 'Failed to fetch history'}, status=500)
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_url_analysis(request):
+    """Latest stored analysis for one URL and form factor, with HTTP validators"""
+    url = request.query_params.get('url')
+    form_factor = request.query_params.get('form_factor', 'ALL_FORM_FACTORS')
+    if not url:
+        return Response({'error': 'url is required'}, status=400)
+    if form_factor not in FORM_FACTORS:
+        return Response({'error': f'Invalid form_factor: {form_factor}'}, status=400)
+    
+    report = CruxReport.objects.filter(url_key=url_key(url), form_factor=form_factor).first()
+    if report is None:
+        return Response({'error': 'No analysis stored for this URL; analyze it first'}, status=404)
+    
+    # A new report row is the only way the data changes, so its id is the version
+    etag = resource_etag(request, report.url_key, report.form_factor, report.id)
+    max_age = settings.CRUX_CACHE_MAX_AGE
+    cached = not_modified(request, etag, report.created_at, max_age)
+    if cached is not None:
+        return cached
+    return set_validators(Response(AnalysisResult.from_report(report).to_dict()), etag, report.created_at, max_age)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_analysis_session(request, session_id):
+    """Results of a past analysis session, rebuilt from the stored reports"""
+    try:
+        session, reports = load_session(session_id)
+    except AnalysisSession.DoesNotExist:
+        return Response({'error': 'Analysis session not found'}, status=404)
+    
+    etag = resource_etag(request, session.session_id, *(report.id for report in reports))
+    last_modified = max((report.created_at for report in reports), default=session.created_at)
+    max_age = settings.CRUX_CACHE_MAX_AGE
+    cached = not_modified(request, etag, last_modified, max_age)
+    if cached is not None:
+        return cached
+    
+    by_key = {}
+    for report in reports:
+        by_key.setdefault(report.url_key, report)
+    results = []
+    for url in session.urls:
+        report = by_key.get(url_key(url))
+        if report is None:
+            missing = AnalysisResult.placeholder(url, None, 'No data available')
+            missing.created_at = None
+            results.append(missing)
+        else:
+            results.append(AnalysisResult.from_report(report))
+    
+    response_data = {
+        'session_id': session.session_id,
+        'created_at': session.created_at.isoformat(),
+        'results': [result.to_dict() for result in results]
+    }
+    if len(results) > 1:
+        with SUMMARY_TIME.time():
+            response_data['summary'] = summarize(results)
+    return set_validators(Response(response_data), etag, last_modified, max_age)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def diff_analysis_sessions(request, session_id, other_session_id):
+    """Metric-by-metric comparison of two sessions, from ``session_id`` (base) to ``other_session_id``"""
+    try:
+        limit = int(request.query_params.get('limit', 50))
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=400)
+    if limit < 0:
+        return Response({'error': 'limit must not be negative'}, status=400)
+    
+    sessions = {
+        session.session_id: session
+        for session in AnalysisSession.objects.filter(session_id__in=(session_id, other_session_id))
+    }
+    missing = [sid for sid in (session_id, other_session_id) if sid not in sessions]
+    if missing:
+        return Response({'error': f'Analysis session not found: {", ".join(missing)}'}, status=404)
+    base, head = sessions[session_id], sessions[other_session_id]
+    
+    # Sessions fill up while an analysis runs, so their reports are part of the version
+    version = reports_version(base, head)
+    etag = resource_etag(request, 'diff', base.session_id, head.session_id, limit, version['count'], version['last_id'])
+    last_modified = max(filter(None, (base.created_at, head.created_at, version['last_created'])))
+    max_age = settings.CRUX_CACHE_MAX_AGE
+    cached = not_modified(request, etag, last_modified, max_age)
+    if cached is not None:
+        return cached
+    
+    response_data = {
+        'base': {'session_id': base.session_id, 'created_at': base.created_at.isoformat(), 'url_count': len(base.urls)},
+        'head': {'session_id': head.session_id, 'created_at': head.created_at.isoformat(), 'url_count': len(head.urls)},
+        **diff_sessions(base, head, limit=limit),
+    }
+    return set_validators(Response(response_data), etag, last_modified, max_age)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def export_reports(request):
+    """Stream report history or monthly rollups as CSV, JSONL or Parquet
+
+    Accepts the same filters as the history endpoint. ``output`` selects the
+    file format and ``compress=gzip`` compresses the stream on the fly.
+    """
+    dataset = request.query_params.get('dataset', 'reports')
+    fmt = request.query_params.get('output', 'csv')
+    compress = request.query_params.get('compress') == 'gzip'
+
+    if dataset not in DATASETS:
+        return Response({'error': f'Invalid dataset. Choose one of: {", ".join(DATASETS)}'}, status=400)
+    if fmt not in EXPORT_FORMATS:
+        return Response({'error': f'Invalid output. Choose one of: {", ".join(EXPORT_FORMATS)}'}, status=400)
+
+    try:
+        reports = filter_reports(CruxReport.objects.all(), request.query_params)
+        chunks = stream_export(reports, dataset=dataset, fmt=fmt, compress=compress)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+    except ImportError as e:
+        # pyarrow is optional; the other formats need nothing extra
+        return Response({'error': f'{e}; install it or choose output=csv or output=jsonl'}, status=400)
+
+    response = StreamingHttpResponse(
+        chunks,
+        content_type='application/gzip' if compress else CONTENT_TYPES[fmt],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(dataset, fmt, compress)}"'
+    return response
+
 @csrf_exempt
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def analyze_urls(request):
     """Analyze one or more URLs using CrUX API"""
+    from .analysis import CruxAPIClient, analyze_url
+    from .keypool import configured_api_keys
+
     try:
         # Get request data
         urls = request.data.get('urls', [])
@@ -162,9 +313,14 @@ def analyze_urls(request):
         
         # Validate URLs
         valid_urls = []
+        seen_keys = set()
         for url in urls:
             if isinstance(url, str) and (url.startswith('http://') or url.startswith('https://')):
-                valid_urls.append(url)
+                # Different spellings of the same page are analyzed once
+                key = url_key(url)
+                if key not in seen_keys:
+                    seen_keys.add(key)
+                    valid_urls.append(url)
         
         if not valid_urls:
             return Response({'error': 'No valid URLs provided'}, status=400)
@@ -176,7 +332,7 @@ def analyze_urls(request):
         USE_MOCK_DATA = False  # Set to True to use mock data
         
         # Check if API key is configured and working
-        api_key_valid = settings.CRUX_API_KEY and len(settings.CRUX_API_KEY) > 20 and not USE_MOCK_DATA
+        api_key_valid = any(len(key) > 20 for key in configured_api_keys()) and not USE_MOCK_DATA
         
         if not api_key_valid:
             # Return mock data for testing
@@ -189,69 +345,51 @@ def analyze_urls(request):
                 
                 performance_rating = 'Good' if i % 3 == 0 else 'Needs Improvement' if i % 3 == 1 else 'Poor'
                 
-                results.append({
-                    'url': url,
-                    'form_factor': form_factor,
-                    'metrics': [
-                        {
-                            'metric_name': 'Largest Contentful Paint (LCP)',
-                            'p75_value': base_lcp,
-                            'good_ratio': 0.8 - (i * 0.1),
-                            'needs_improvement_ratio': 0.15,
-                            'poor_ratio': 0.05 + (i * 0.1)
-                        },
-                        {
-                            'metric_name': 'Interaction to Next Paint (INP)',
-                            'p75_value': base_fid,  # Reuse FID value for INP
-                            'good_ratio': 0.85 - (i * 0.05),
-                            'needs_improvement_ratio': 0.10,
-                            'poor_ratio': 0.05 + (i * 0.05)
-                        },
-                        {
-                            'metric_name': 'Cumulative Layout Shift (CLS)',
-                            'p75_value': base_cls,
-                            'good_ratio': 0.75 - (i * 0.08),
-                            'needs_improvement_ratio': 0.15,
-                            'poor_ratio': 0.10 + (i * 0.08)
-                        },
-                        {
-                            'metric_name': 'First Contentful Paint (FCP)',
-                            'p75_value': 1500 + (i * 100),
-                            'good_ratio': 0.78 - (i * 0.06),
-                            'needs_improvement_ratio': 0.12,
-                            'poor_ratio': 0.10 + (i * 0.06)
-                        }
-                    ],
-                    'overall_performance': performance_rating,
-                    'created_at': datetime.now().isoformat()
-                })
+                result = AnalysisResult(url, form_factor, performance_rating)
+                result.set_metric(Metric.LCP, base_lcp, 0.8 - (i * 0.1), 0.15, 0.05 + (i * 0.1))
+                result.set_metric(Metric.INP, base_fid, 0.85 - (i * 0.05), 0.10, 0.05 + (i * 0.05))  # Reuse FID value for INP
+                result.set_metric(Metric.CLS, base_cls, 0.75 - (i * 0.08), 0.15, 0.10 + (i * 0.08))
+                result.set_metric(Metric.FCP, 1500 + (i * 100), 0.78 - (i * 0.06), 0.12, 0.10 + (i * 0.06))
+                results.append(result)
+            
+            FALLBACKS.inc(len(valid_urls), reason='mock')
+            
+            # Persist the session so it can be fetched again from /api/sessions/
+            with DB_WRITE_TIME.time(model='AnalysisSession'):
+                session = AnalysisSession.objects.create(
+                    session_id=session_id,
+                    urls=valid_urls
+                )
             
             # Save mock data to database
             for i, url in enumerate(valid_urls):
-                CruxReport.objects.create(
-                    url=url,
-                    form_factor=form_factor,
-                    largest_contentful_paint=2000.0 + (i * 200.0),
-                    first_input_delay=50.0 + (i * 25.0),  # Keep for database compatibility
-                    cumulative_layout_shift=0.05 + (i * 0.02),
-                    first_contentful_paint=1500.0 + (i * 100.0),
-                    interaction_to_next_paint=150.0 + (i * 50.0),
-                    time_to_first_byte=600.0 + (i * 100.0),  # Keep for database compatibility
-                    api_response={'mock': True, 'generated_at': datetime.now().isoformat()}
-                )
+                with DB_WRITE_TIME.time(model='CruxReport'):
+                    CruxReport.objects.create(
+                        session=session,
+                        url=url,
+                        form_factor=form_factor,
+                        largest_contentful_paint=2000.0 + (i * 200.0),
+                        first_input_delay=50.0 + (i * 25.0),  # Keep for database compatibility
+                        cumulative_layout_shift=0.05 + (i * 0.02),
+                        first_contentful_paint=1500.0 + (i * 100.0),
+                        interaction_to_next_paint=150.0 + (i * 50.0),
+                        time_to_first_byte=600.0 + (i * 100.0),  # Keep for database compatibility
+                        api_response={'mock': True, 'generated_at': datetime.now().isoformat()}
+                    )
             
             response_data = {
                 'session_id': session_id,
-                'results': results,
+                'results': [result.to_dict() for result in results],
                 'note': 'Mock data for testing - Set USE_MOCK_DATA=False for real API data'
             }
             
             # Add summary for multiple URLs
             if len(valid_urls) > 1:
                 try:
-                    response_data['summary'] = calculate_summary_statistics(results)
+                    with span('summary'), SUMMARY_TIME.time():
+                        response_data['summary'] = summarize(results)
                 except Exception as e:
-                    logger.error(f"Error calculating mock summary statistics: {e}")
+                    logger.error("Error calculating mock summary statistics: %s", e)
                     # Provide fallback summary for mock data
                     response_data['summary'] = [
                         {
@@ -269,360 +407,34 @@ def analyze_urls(request):
         # Real API implementation (when API key is provided)
         client = CruxAPIClient()
         
-        for url in valid_urls:
-            try:
-                # Fetch data from CrUX API
-                api_response = client.get_url_metrics(url, form_factor)
-                processed_data = client.process_metrics(api_response, url, form_factor)
-                results.append(processed_data)
-                
-                # Save to database
-                crux_report = CruxReport(
-                    url=url,
-                    form_factor=form_factor,
-                    api_response=api_response
-                )
-                
-                # Extract specific metrics
-                for metric in processed_data['metrics']:
-                    metric_name = metric['metric_name'].lower()
-                    if 'largest contentful paint' in metric_name:
-                        crux_report.largest_contentful_paint = metric['p75_value']
-                    elif 'first input delay' in metric_name:
-                        crux_report.first_input_delay = metric['p75_value']
-                    elif 'cumulative layout shift' in metric_name:
-                        crux_report.cumulative_layout_shift = metric['p75_value']
-                
-                crux_report.save()
-                
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 400:
-                    logger.warning(f"No CrUX data available for {url} - using fallback data")
-                    # Return fallback data for URLs without CrUX data
-                    results.append({
-                        'url': url,
-                        'form_factor': form_factor,
-                        'metrics': [
-                            {
-                                'metric_name': 'Largest Contentful Paint (LCP)',
-                                'p75_value': None,
-                                'good_ratio': None,
-                                'needs_improvement_ratio': None,
-                                'poor_ratio': None
-                            }
-                        ],
-                        'overall_performance': 'No data available',
-                        'created_at': datetime.now().isoformat()
-                    })
-                elif e.response.status_code == 403:
-                    logger.error(f"API key permission denied for {url}")
-                    results.append({
-                        'url': url,
-                        'form_factor': form_factor,
-                        'metrics': [],
-                        'overall_performance': 'API key error - check permissions',
-                        'created_at': datetime.now().isoformat()
-                    })
-                else:
-                    logger.error(f"HTTP error analyzing URL {url}: {str(e)}")
-                    results.append({
-                        'url': url,
-                        'form_factor': form_factor,
-                        'metrics': [],
-                        'overall_performance': f'API Error: {e.response.status_code}',
-                        'created_at': datetime.now().isoformat()
-                    })
-            except Exception as e:
-                logger.error(f"Error analyzing URL {url}: {str(e)}")
-                results.append({
-                    'url': url,
-                    'form_factor': form_factor,
-                    'metrics': [],
-                    'overall_performance': f'Error: {str(e)}',
-                    'created_at': datetime.now().isoformat()
-                })
+        # Create analysis session first so its reports can point at it
+        with DB_WRITE_TIME.time(model='AnalysisSession'):
+            session = AnalysisSession.objects.create(
+                session_id=session_id,
+                urls=valid_urls
+            )
         
-        # Create analysis session
-        AnalysisSession.objects.create(
-            session_id=session_id,
-            urls=valid_urls
-        )
+        for url in valid_urls:
+            results.append(analyze_url(client, url, form_factor, session=session))
         
+        # Results stay compact until the response is built
         response_data = {
             'session_id': session_id,
-            'results': results
+            'results': [result.to_dict() for result in results]
         }
         
         # Add summary statistics for multiple URLs
         if len(valid_urls) > 1:
             try:
-                response_data['summary'] = calculate_summary_statistics(results)
+                with span('summary'), SUMMARY_TIME.time():
+                    response_data['summary'] = summarize(results)
             except Exception as e:
-                logger.error(f"Error calculating summary statistics: {e}")
+                logger.error("Error calculating summary statistics: %s", e)
                 response_data['summary'] = []
                 response_data['summary_error'] = 'Failed to calculate summary statistics'
         
         return Response(response_data)
         
     except Exception as e:
-        logger.error(f"Error in analyze_urls: {str(e)}")
+        logger.error("Error in analyze_urls: %s", e)
         return Response({'error': f'Analysis failed: {str(e)}'}, status=500)
-
-class CruxAPIClient:
-    """Client for interacting with Chrome UX Report API"""
-    
-    def __init__(self):
-        self.api_key = settings.CRUX_API_KEY
-        self.base_url = settings.CRUX_API_URL
-    
-    def get_url_metrics(self, url, form_factor='ALL_FORM_FACTORS'):
-        """Fetch CrUX metrics following official Chrome Developers documentation"""
-        if not self.api_key:
-            raise ValueError("CrUX API key not configured")
-        
-        # Clean up the URL according to CrUX API requirements
-        clean_url = url.rstrip('/').split('#')[0].split('?')[0]
-        
-        # Valid metrics as of 2024/2025 - FID is deprecated, replaced by INP
-        valid_metrics = [
-            "largest_contentful_paint",         # LCP - Loading
-            "cumulative_layout_shift",          # CLS - Visual Stability  
-            "interaction_to_next_paint",        # INP - Interactivity (replaces FID)
-            "first_contentful_paint"            # FCP - Loading
-            # Note: time_to_first_byte and first_input_delay are no longer available
-        ]
-        
-        # Try both origin and URL approaches as per official docs
-        payloads = [
-            {
-                "description": "URL-based query",
-                "payload": {
-                    "url": clean_url,
-                    "formFactor": form_factor,
-                    "metrics": valid_metrics
-                }
-            },
-            {
-                "description": "Origin-based query",
-                "payload": {
-                    "origin": clean_url,
-                    "formFactor": form_factor,
-                    "metrics": valid_metrics
-                }
-            }
-        ]
-        
-        logger.info(f"Making CrUX API request for {clean_url} with form factor {form_factor}")
-        logger.info(f"Using metrics: {valid_metrics}")
-        
-        # Try URL first, then origin
-        for attempt in payloads:
-            try:
-                response = requests.post(
-                    f"{self.base_url}?key={self.api_key}",
-                    json=attempt["payload"],
-                    timeout=30,
-                    headers={
-                        'Content-Type': 'application/json'
-                    }
-                )
-                
-                logger.info(f"CrUX API response status: {response.status_code} for {attempt['description']}")
-                
-                if response.status_code == 200:
-                    logger.info("✅ Successfully received CrUX data")
-                    return response.json()
-                elif response.status_code == 400:
-                    try:
-                        error_details = response.json()
-                        logger.warning(f"400 error details: {error_details}")
-                    except:
-                        pass
-                    logger.warning(f"400 error for {attempt['description']}, trying next approach...")
-                    continue
-                else:
-                    response.raise_for_status()
-                    
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 400:
-                    continue  # Try next approach
-                logger.error(f"CrUX API HTTP error for {clean_url}: {str(e)}")
-                raise
-            except requests.exceptions.RequestException as e:
-                logger.error(f"CrUX API request failed for {clean_url}: {str(e)}")
-                raise
-        
-        # If both approaches failed with 400, raise an exception
-        raise requests.exceptions.HTTPError(f"No CrUX data available for {clean_url}")
-    
-    def process_metrics(self, api_response, url, form_factor):
-        """Process API response into structured format"""
-        metrics = []
-        
-        if 'record' not in api_response or 'metrics' not in api_response['record']:
-            return {
-                'url': url,
-                'form_factor': form_factor,
-                'metrics': [],
-                'overall_performance': 'No data available',
-                'created_at': datetime.now().isoformat()
-            }
-        
-        raw_metrics = api_response['record']['metrics']
-        
-        # Updated metric mapping for current CrUX API
-        metric_mapping = {
-            'largest_contentful_paint': 'Largest Contentful Paint (LCP)',
-            'cumulative_layout_shift': 'Cumulative Layout Shift (CLS)',
-            'interaction_to_next_paint': 'Interaction to Next Paint (INP)',
-            'first_contentful_paint': 'First Contentful Paint (FCP)',
-            # Deprecated metrics (kept for backward compatibility)
-            'first_input_delay': 'First Input Delay (FID)',
-            'time_to_first_byte': 'Time to First Byte (TTFB)'
-        }
-        
-        for metric_key, metric_name in metric_mapping.items():
-            if metric_key in raw_metrics:
-                metric_data = raw_metrics[metric_key]
-                
-                # Extract P75 value
-                p75_value = None
-                if 'percentiles' in metric_data and 'p75' in metric_data['percentiles']:
-                    p75_value = metric_data['percentiles']['p75']
-                
-                # Extract histogram data for user experience ratios
-                good_ratio = needs_improvement_ratio = poor_ratio = None
-                if 'histogram' in metric_data and metric_data['histogram']:
-                    histogram = metric_data['histogram']
-                    total_samples = sum(bucket.get('density', 0) for bucket in histogram)
-                    
-                    if total_samples > 0:
-                        for i, bucket in enumerate(histogram):
-                            density = bucket.get('density', 0)
-                            ratio = density / total_samples
-                            
-                            # First bucket is typically "good"
-                            if i == 0:
-                                good_ratio = ratio
-                            # Last bucket is typically "poor"
-                            elif i == len(histogram) - 1:
-                                poor_ratio = ratio
-                            # Middle bucket(s) are "needs improvement"
-                            else:
-                                if needs_improvement_ratio is None:
-                                    needs_improvement_ratio = ratio
-                                else:
-                                    needs_improvement_ratio += ratio
-                
-                metrics.append({
-                    'metric_name': metric_name,
-                    'p75_value': p75_value,
-                    'good_ratio': good_ratio,
-                    'needs_improvement_ratio': needs_improvement_ratio,
-                    'poor_ratio': poor_ratio
-                })
-        
-        # Determine overall performance based on Core Web Vitals
-        overall_performance = self.calculate_overall_performance(metrics)
-        
-        return {
-            'url': url,
-            'form_factor': form_factor,
-            'metrics': metrics,
-            'overall_performance': overall_performance,
-            'created_at': datetime.now().isoformat()
-        }
-    
-    def calculate_overall_performance(self, metrics):
-        """Calculate overall performance rating based on Core Web Vitals"""
-        # Core Web Vitals: LCP, CLS, and INP (replaced FID)
-        core_vitals = [
-            'Largest Contentful Paint (LCP)', 
-            'Cumulative Layout Shift (CLS)', 
-            'Interaction to Next Paint (INP)'
-        ]
-        
-        good_scores = 0
-        total_scores = 0
-        
-        for metric in metrics:
-            if metric['metric_name'] in core_vitals and metric['good_ratio'] is not None:
-                total_scores += 1
-                # Good threshold: 75% of users should have good experience
-                if metric['good_ratio'] >= 0.75:
-                    good_scores += 1
-        
-        if total_scores == 0:
-            return 'Insufficient data'
-        
-        ratio = good_scores / total_scores
-        if ratio >= 0.67:  # At least 2 out of 3 Core Web Vitals are good
-            return 'Good'
-        elif ratio >= 0.33:  # At least 1 out of 3 Core Web Vitals are good
-            return 'Needs Improvement'
-        else:
-            return 'Poor'
-
-def calculate_summary_statistics(results):
-    """Calculate summary statistics across multiple URL results"""
-    if not results:
-        return []
-    
-    # Group metrics by name
-    metric_groups = {}
-    for result in results:
-        metrics = result.get('metrics', [])
-        if not metrics:
-            continue
-            
-        for metric in metrics:
-            if not isinstance(metric, dict):
-                continue
-                
-            metric_name = metric.get('metric_name')
-            p75_value = metric.get('p75_value')
-            
-            if metric_name and p75_value is not None:
-                try:
-                    # Ensure p75_value is a number
-                    p75_value = float(p75_value)
-                    
-                    if metric_name not in metric_groups:
-                        metric_groups[metric_name] = []
-                    
-                    metric_groups[metric_name].append({
-                        'value': p75_value,
-                        'url': result.get('url', '')
-                    })
-                except (ValueError, TypeError) as e:
-                    logger.warning(f"Invalid p75_value for {metric_name}: {p75_value} - {e}")
-                    continue
-    
-    summary = []
-    for metric_name, values in metric_groups.items():
-        if not values:
-            continue
-        
-        try:
-            # Calculate average
-            total_value = sum(float(item['value']) for item in values)
-            avg_value = total_value / len(values)
-            
-            # Find best and worst (lower values are typically better for performance metrics)
-            best_item = min(values, key=lambda x: float(x['value']))
-            worst_item = max(values, key=lambda x: float(x['value']))
-            
-            summary.append({
-                'metric_name': metric_name,
-                'average_p75': round(avg_value, 2),
-                'best_url': best_item['url'],
-                'worst_url': worst_item['url'], 
-                'best_value': round(float(best_item['value']), 2),
-                'worst_value': round(float(worst_item['value']), 2)
-            })
-            
-        except (ValueError, TypeError, ZeroDivisionError) as e:
-            logger.error(f"Error calculating summary for {metric_name}: {e}")
-            continue
-    
-    return summary
\ No newline at end of file
@@ -0,0 +1,34 @@
+"""Process pools whose workers run Django code, under any multiprocessing start method
+
+Under spawn and forkserver (the default on macOS, and on Linux from
+Python 3.14) a worker starts from a fresh interpreter and must call
+django.setup() before it can import anything that defines models. The
+initializer therefore lives here, in a module that imports no models, and
+runs any further per-worker setup by dotted path once Django is ready.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import connections
+
+
+def setup_worker(initializer=None, *args):
+    """Pool initializer: set up Django, then run ``initializer`` (a dotted path) with ``args``"""
+    import django
+    from django.utils.module_loading import import_string
+
+    django.setup()
+    if initializer:
+        import_string(initializer)(*args)
+
+
+def process_pool(workers, initializer=None, initargs=()):
+    """ProcessPoolExecutor with Django set up in every worker
+
+    ``initializer`` is a dotted path called with ``initargs`` after setup.
+    Connections are closed first so forked children never share the
+    parent's database sockets.
+    """
+    connections.close_all()
+    return ProcessPoolExecutor(
+        max_workers=workers, initializer=setup_worker, initargs=(initializer, *initargs),
+    )
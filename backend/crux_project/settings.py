@@ -1,4 +1,6 @@
 import os
+import django
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -30,6 +32,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'crux_api.instrumentation.MetricsMiddleware',
+    'crux_api.tracing.RequestTracingMiddleware',
+    'crux_api.compression.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -60,12 +65,66 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'crux_project.wsgi.application'
 
-# Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Database - SQLite by default; CRUX_DB_ENGINE=postgres switches to PostgreSQL
+# (needs psycopg: pip install "psycopg[binary,pool]"). Connections are kept for
+# CRUX_DB_CONN_MAX_AGE seconds instead of reconnecting on every request
+CRUX_DB_ENGINE = os.getenv('CRUX_DB_ENGINE', 'sqlite').lower()
+CRUX_DB_CONN_MAX_AGE = int(os.getenv('CRUX_DB_CONN_MAX_AGE', '60'))
+
+if CRUX_DB_ENGINE in ('postgres', 'postgresql'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('CRUX_DB_NAME', 'crux'),
+            'USER': os.getenv('CRUX_DB_USER', 'crux'),
+            'PASSWORD': os.getenv('CRUX_DB_PASSWORD', ''),
+            'HOST': os.getenv('CRUX_DB_HOST', 'localhost'),
+            'PORT': os.getenv('CRUX_DB_PORT', '5432'),
+            'CONN_MAX_AGE': CRUX_DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': int(os.getenv('CRUX_DB_CONNECT_TIMEOUT', '5')),
+            },
+            # Transaction-pooling PgBouncer can't hold server-side cursors (used by exports)
+            'DISABLE_SERVER_SIDE_CURSORS': os.getenv('CRUX_DB_PGBOUNCER', 'false').lower() == 'true',
+        }
+    }
+    if os.getenv('CRUX_DB_POOL', 'false').lower() == 'true':
+        # psycopg's built-in pool; Django requires persistent connections off when pooling
+        if django.VERSION < (5, 1):
+            raise ImproperlyConfigured(
+                "CRUX_DB_POOL needs Django 5.1+; use PgBouncer with CRUX_DB_PGBOUNCER=true instead"
+            )
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv('CRUX_DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.getenv('CRUX_DB_POOL_MAX_SIZE', '10')),
+            'timeout': float(os.getenv('CRUX_DB_POOL_TIMEOUT', '10')),
+        }
+elif CRUX_DB_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('CRUX_DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': CRUX_DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
     }
+    if django.VERSION >= (5, 1):
+        # Take the write lock at BEGIN, so writers wait on busy_timeout instead
+        # of failing when a read transaction tries to upgrade
+        DATABASES['default']['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+else:
+    raise ImproperlyConfigured(f"Unsupported CRUX_DB_ENGINE: {CRUX_DB_ENGINE} (use sqlite or postgres)")
+
+# Applied to every new SQLite connection (see crux_api.db, which validates
+# them). WAL lets readers run alongside the single writer, and
+# synchronous=NORMAL is safe under WAL
+CRUX_SQLITE_PRAGMAS = {
+    'busy_timeout': int(os.getenv('CRUX_SQLITE_BUSY_TIMEOUT_MS', '5000')),
+    'journal_mode': os.getenv('CRUX_SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.getenv('CRUX_SQLITE_SYNCHRONOUS', 'NORMAL'),
 }
 
 # Password validation
@@ -124,22 +183,95 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'crux_api.renderers.FastJSONRenderer',
+        'crux_api.renderers.CompactJSONRenderer',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [],  # No authentication required
 }
 
-# CrUX API Configuration - Only this comes from .env
+# CrUX API Configuration - the key comes from .env; the URL can point at
+# the local simulator (manage.py run_crux_simulator) for offline work
 CRUX_API_KEY = os.getenv('CRUX_API_KEY')
-CRUX_API_URL = 'https://chromeuxreport.googleapis.com/v1/records:queryRecord'
+# Optional pool of keys (comma-separated) used instead of CRUX_API_KEY. Each
+# key gets CRUX_API_KEY_QUOTA calls per CRUX_API_KEY_QUOTA_WINDOW seconds (the
+# CrUX API default is 150 per minute); callers wait up to CRUX_API_KEY_WAIT
+# seconds for a key to free up
+CRUX_API_KEYS = [key.strip() for key in os.getenv('CRUX_API_KEYS', '').split(',') if key.strip()]
+CRUX_API_KEY_QUOTA = int(os.getenv('CRUX_API_KEY_QUOTA', '150'))
+CRUX_API_KEY_QUOTA_WINDOW = float(os.getenv('CRUX_API_KEY_QUOTA_WINDOW', '60'))
+CRUX_API_KEY_WAIT = float(os.getenv('CRUX_API_KEY_WAIT', '5'))
+CRUX_API_URL = os.getenv('CRUX_API_URL', 'https://chromeuxreport.googleapis.com/v1/records:queryRecord')
+
+# Upstream resilience: short per-attempt timeouts, retries with jittered
+# exponential backoff (honoring Retry-After up to CRUX_RETRY_MAX_DELAY) within
+# a per-query deadline, optional hedged requests once an attempt outlives the
+# observed p95, and a circuit breaker that serves stored data while open
+CRUX_CONNECT_TIMEOUT = float(os.getenv('CRUX_CONNECT_TIMEOUT', '3.05'))
+CRUX_READ_TIMEOUT = float(os.getenv('CRUX_READ_TIMEOUT', '10'))
+CRUX_RETRY_ATTEMPTS = int(os.getenv('CRUX_RETRY_ATTEMPTS', '3'))
+CRUX_RETRY_BASE_DELAY = float(os.getenv('CRUX_RETRY_BASE_DELAY', '0.25'))
+CRUX_RETRY_MAX_DELAY = float(os.getenv('CRUX_RETRY_MAX_DELAY', '10'))
+CRUX_REQUEST_DEADLINE = float(os.getenv('CRUX_REQUEST_DEADLINE', '20'))
+CRUX_HEDGE_ENABLED = os.getenv('CRUX_HEDGE_ENABLED', 'false').lower() == 'true'
+CRUX_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CRUX_CIRCUIT_FAILURE_THRESHOLD', '5'))
+CRUX_CIRCUIT_RESET_SECONDS = float(os.getenv('CRUX_CIRCUIT_RESET_SECONDS', '30'))
+
+# HTTP caching (seconds) for GET-able analysis resources. CrUX data for a URL
+# only changes once per collection period; history changes with every analysis
+CRUX_CACHE_MAX_AGE = int(os.getenv('CRUX_CACHE_MAX_AGE', '3600'))
+CRUX_HISTORY_CACHE_MAX_AGE = int(os.getenv('CRUX_HISTORY_CACHE_MAX_AGE', '60'))
+
+# Request tracing (off by default): Server-Timing headers on every response,
+# slow-request logging and sampled cProfile dumps for slow requests
+CRUX_TRACING_ENABLED = os.getenv('CRUX_TRACING_ENABLED', 'false').lower() == 'true'
+CRUX_TRACE_SLOW_MS = float(os.getenv('CRUX_TRACE_SLOW_MS', '1000'))
+CRUX_PROFILE_SAMPLE_RATE = float(os.getenv('CRUX_PROFILE_SAMPLE_RATE', '0'))
+CRUX_PROFILE_DIR = os.getenv('CRUX_PROFILE_DIR', str(BASE_DIR / 'profiles'))
+
+# Worker startup: CRUX_WARMUP imports the request and analysis paths, builds
+# the CrUX client and opens database connections in wsgi.py, before the
+# worker takes traffic; CRUX_WARMUP_PRECONNECT also opens a keep-alive
+# connection to the CrUX API host. Startup timings are on /api/health/
+CRUX_WARMUP = os.getenv('CRUX_WARMUP', 'false').lower() == 'true'
+CRUX_WARMUP_PRECONNECT = os.getenv('CRUX_WARMUP_PRECONNECT', 'true').lower() == 'true'
+
+# Logging: records are queued and written by a background thread
+# (CRUX_LOG_ASYNC) as plain text, or as JSON lines with CRUX_LOG_FORMAT=json
+# (meant for deployments). Chatty loggers can be sampled below WARNING with
+# CRUX_LOG_SAMPLE_RATES, e.g. "crux_api.analysis=0.1"; dropped records are
+# counted in /api/metrics/
+CRUX_LOG_ASYNC = os.getenv('CRUX_LOG_ASYNC', 'true').lower() == 'true'
+CRUX_LOG_FORMAT = os.getenv('CRUX_LOG_FORMAT', 'text')
+CRUX_LOG_LEVEL = os.getenv('CRUX_LOG_LEVEL', 'INFO').upper()
+CRUX_LOG_QUEUE_SIZE = int(os.getenv('CRUX_LOG_QUEUE_SIZE', '10000'))
+CRUX_LOG_SAMPLE_RATES = os.getenv('CRUX_LOG_SAMPLE_RATES', '')
+
+if CRUX_LOG_FORMAT not in ('json', 'text'):
+    raise ImproperlyConfigured(f"CRUX_LOG_FORMAT must be json or text, not {CRUX_LOG_FORMAT!r}")
 
-# Logging configuration
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'crux_api.logs.JSONFormatter',
+        },
+        'text': {
+            'format': '%(message)s',
+        },
+    },
+    'filters': {
+        'sampling': {
+            '()': 'crux_api.logs.SamplingFilter',
+            'rates': CRUX_LOG_SAMPLE_RATES,
+        },
+    },
     'handlers': {
         'console': {
-            'class': 'logging.StreamHandler',
+            'class': 'crux_api.logs.AsyncStreamHandler' if CRUX_LOG_ASYNC else 'logging.StreamHandler',
+            'formatter': CRUX_LOG_FORMAT,
+            'filters': ['sampling'],
+            **({'queue_size': CRUX_LOG_QUEUE_SIZE} if CRUX_LOG_ASYNC else {}),
         },
     },
     'root': {
@@ -154,8 +286,12 @@ LOGGING = {
         },
         'crux_api': {
             'handlers': ['console'],
-            'level': 'DEBUG',
+            'level': CRUX_LOG_LEVEL,
             'propagate': False,
         },
     },
-}
\ No newline at end of file
+}
+
+# Sitemap discovery: optional dotted path to a callable(location) that
+# returns a binary stream. Defaults to local files and streamed HTTP(S).
+CRUX_SITEMAP_FETCHER = os.getenv('CRUX_SITEMAP_FETCHER')
@@ -11,7 +11,11 @@ def api_root(request):
         'endpoints': {
             'analyze': '/api/analyze/',
             'history': '/api/history/',
-            'health': '/api/health/'
+            'analysis': '/api/analysis/',
+            'sessions': '/api/sessions/<session_id>/',
+            'export': '/api/export/',
+            'health': '/api/health/',
+            'metrics': '/api/metrics/'
         },
         'status': 'active',
         'timestamp': datetime.now().isoformat()
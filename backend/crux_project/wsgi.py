@@ -1,7 +1,17 @@
 import os
+import time
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
+from crux_api.startup import record_phase, warm_up
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crux_project.settings')
 
-application = get_wsgi_application()
\ No newline at end of file
+started = time.perf_counter()
+application = get_wsgi_application()
+record_phase('django_setup', time.perf_counter() - started)
+
+# Optional: import the analysis path and open connections before taking traffic
+if settings.CRUX_WARMUP:
+    warm_up()